@@ -0,0 +1,139 @@
+import numpy as np
+
+# Season statistics over dense arrays. pack() flattens one or more league
+# dicts (weeks -> games -> player -> placement/points) into a
+# (games x players) placement matrix in play order, 0 where a player sat
+# out, plus each game's week counted across all seasons. Every stat below
+# is computed from those arrays; SeasonStats computes them all at once and
+# is cached by the caller until results change.
+
+ELO_BASE = 1500.0
+ELO_K = 32.0
+
+class Packed:
+    def __init__(self, players, placement, points, week_of):
+        self.players = players                        # player ids (str), column order
+        self.index = {p: i for i, p in enumerate(players)}
+        self.placement = placement                    # int16 (games, players)
+        self.points = points                          # int16 (games, players)
+        self.played = placement > 0
+        self.week_of = week_of                        # int32 (games,), running week number
+
+def pack(seasons) -> Packed:
+    players, index = [], {}
+    rows, week_of, week_no = [], [], 0
+    for data in seasons:
+        for pid in data.get('players', []):
+            if str(pid) not in index:
+                index[str(pid)] = len(players)
+                players.append(str(pid))
+        for week in sorted(data.get('weeks', {}), key=int):
+            for game in sorted(data['weeks'][week]['games'], key=int):
+                rows.append(data['weeks'][week]['games'][game])
+                week_of.append(week_no)
+            week_no += 1
+    for game in rows:
+        for pid in game:
+            if pid not in index:
+                index[pid] = len(players)
+                players.append(pid)
+    placement = np.zeros((len(rows), len(players)), dtype=np.int16)
+    points = np.zeros((len(rows), len(players)), dtype=np.int16)
+    for g, game in enumerate(rows):
+        for pid, rec in game.items():
+            placement[g, index[pid]] = rec['placement']
+            points[g, index[pid]] = rec['points']
+    return Packed(players, placement, points, np.asarray(week_of, dtype=np.int32))
+
+def games_played(pk: Packed):
+    return pk.played.sum(axis=0)
+
+def average_placement(pk: Packed):
+    n = games_played(pk)
+    return np.divide(pk.placement.sum(axis=0), n, out=np.full(n.shape, np.nan), where=n > 0)
+
+def win_rate(pk: Packed):
+    n = games_played(pk)
+    return np.divide((pk.placement == 1).sum(axis=0), n, out=np.zeros(n.shape), where=n > 0)
+
+# h2h[i, j]: games where player i finished ahead of player j
+
+def head_to_head(pk: Packed):
+    place = np.where(pk.played, pk.placement, np.iinfo(np.int16).max)
+    both = pk.played[:, :, None] & pk.played[:, None, :]
+    return ((place[:, :, None] < place[:, None, :]) & both).sum(axis=0)
+
+# Mean points per week over each player's last `weeks` weeks of play
+
+def rolling_form(pk: Packed, weeks: int = 3):
+    if not len(pk.week_of):
+        return np.zeros(len(pk.players))
+    num_weeks = int(pk.week_of.max()) + 1
+    weekly = np.zeros((num_weeks, len(pk.players)))
+    active = np.zeros((num_weeks, len(pk.players)), dtype=bool)
+    np.add.at(weekly, pk.week_of, pk.points)
+    np.logical_or.at(active, pk.week_of, pk.played)
+    form = np.zeros(len(pk.players))
+    for i in range(len(pk.players)):
+        recent = np.flatnonzero(active[:, i])[-weeks:]
+        if len(recent):
+            form[i] = weekly[recent, i].mean()
+    return form
+
+# Multiplayer Elo: each game is scored as every pairwise result between
+# its players, with K split across the n - 1 opponents. Weeks are rating
+# periods: all of a week's games are scored against the ratings the week
+# started with, which turns the update into array ops per week.
+
+def elo_ratings(pk: Packed, k: float = ELO_K):
+    ratings = np.full(len(pk.players), ELO_BASE)
+    if not len(pk.week_of):
+        return ratings
+    bounds = np.searchsorted(pk.week_of, np.arange(int(pk.week_of.max()) + 2))
+    for s, e in zip(bounds[:-1], bounds[1:]):
+        if s == e:
+            continue
+        place, played = pk.placement[s:e], pk.played[s:e]
+        expected = 1 / (1 + 10 ** ((ratings[None, :] - ratings[:, None]) / 400))
+        actual = (place[:, :, None] < place[:, None, :]) + 0.5 * (place[:, :, None] == place[:, None, :])
+        both = played[:, :, None] & played[:, None, :]
+        score = ((actual - expected[None]) * both).sum(axis=2)
+        opponents = np.maximum(played.sum(axis=1) - 1, 1)
+        ratings += (score * (k / opponents)[:, None]).sum(axis=0)
+    return ratings
+
+class SeasonStats:
+    def __init__(self, seasons, version=None):
+        self.version = version
+        self.packed = pk = pack(seasons)
+        self.games = games_played(pk)
+        self.avg_place = average_placement(pk)
+        self.win_rate = win_rate(pk)
+        self.form = rolling_form(pk)
+        self.elo = elo_ratings(pk)
+        self._h2h = None
+
+    @property
+    def h2h(self):
+        if self._h2h is None:
+            self._h2h = head_to_head(self.packed)
+        return self._h2h
+
+    # Players with games, best rating first
+
+    def leaderboard(self) -> list:
+        pk = self.packed
+        order = np.argsort(-self.elo, kind='stable')
+        return [(pk.players[i], float(self.elo[i]), int(self.games[i]), float(self.avg_place[i]),
+                 float(self.win_rate[i]), float(self.form[i]))
+                for i in order if self.games[i]]
+
+    # (opponent, wins against them, losses to them) for one player
+
+    def record_vs(self, pid: str) -> list:
+        i = self.packed.index.get(pid)
+        if i is None:
+            return []
+        return [(p, int(self.h2h[i, j]), int(self.h2h[j, i]))
+                for j, p in enumerate(self.packed.players)
+                if j != i and self.h2h[i, j] + self.h2h[j, i]]
@@ -0,0 +1,110 @@
+import argparse, asyncio, glob, itertools, os, sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from card_ledger import CsvCardLedger
+from journal import JournaledStore, load_state
+import scoring
+
+# Headless audit of stored leagues: recompute final_scores, allowances and
+# card_additions of every finalized week from its games and the card
+# ledger, and report (or with --fix, rewrite) weeks whose stored values
+# have drifted, e.g. after !editscores on a finalized week. Files are
+# audited in parallel across a process pool; no bot token is needed.
+#
+#   python audit.py [directory] [--fix] [--workers N]
+#
+# Run --fix while the bot is stopped; it writes through the league journal.
+
+FIELDS = ('final_scores', 'allowances', 'card_additions')
+
+# Stored card_additions are the week's cards as added: !removecard and
+# !revalue don't touch them. Only live ledger cards missing from that
+# history (by name) count as drift; returns (stored, recomputed) for those players.
+
+def _card_drift(stored: dict, fresh: dict):
+    name = lambda card: card.rsplit(' ($', 1)[0]
+    out_stored, out_fresh = {}, {}
+    for uid, cards in fresh.items():
+        if Counter(map(name, cards)) - Counter(map(name, stored.get(uid, []))):
+            out_stored[uid] = sorted(stored.get(uid, []))
+            out_fresh[uid] = sorted(cards)
+    return out_stored, out_fresh
+
+# {week: {field: (stored, recomputed)}} for finalized weeks that differ
+
+def audit_league(data: dict, ledger) -> dict:
+    drift = {}
+    for week, wk in sorted(data.get('weeks', {}).items(), key=lambda x: int(x[0])):
+        if not wk.get('finalized'):
+            continue
+        expected = scoring.finalize_week(data, week, ledger)
+        for field in FIELDS:
+            stored, fresh = wk.get(field, {}), expected[field]
+            if field == 'card_additions':
+                stored, fresh = _card_drift(stored, fresh)
+            if stored != fresh:
+                drift.setdefault(week, {})[field] = (stored, fresh)
+    return drift
+
+def cards_path(league_path: str) -> str:
+    d, name = os.path.split(league_path)
+    return os.path.join(d, 'cards_' + name[len('league_'):-len('.json')] + '.csv')
+
+async def _fix(path: str, state: dict, ledger, weeks):
+    store = JournaledStore(path, state)
+    try:
+        for week in weeks:
+            store.record(scoring.finalize_week(state, week, ledger))
+        await store.flush()
+    finally:
+        store.close()
+
+# Worker: (path, drift, error). Runs in a pool process.
+
+def audit_file(path: str, fix: bool = False):
+    try:
+        state = load_state(path)
+        ledger = CsvCardLedger(cards_path(path), readonly=True)
+        drift = audit_league(state, ledger)
+        if fix and drift:
+            asyncio.run(_fix(path, state, ledger, drift))
+        return path, drift, None
+    except Exception as e:
+        return path, {}, f'{type(e).__name__}: {e}'
+
+def describe(drift: dict) -> list:
+    lines = []
+    for week, fields in drift.items():
+        parts = []
+        for field, (stored, fresh) in fields.items():
+            changed = sorted(k for k in set(stored) | set(fresh) if stored.get(k) != fresh.get(k))
+            parts.append(f'{field} ({len(changed)} players)')
+        lines.append(f'  week {week}: ' + ', '.join(parts))
+    return lines
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Recompute and audit stored league weeks')
+    parser.add_argument('directory', nargs='?', default='.', help='folder with league_*.json files')
+    parser.add_argument('--fix', action='store_true', help='rewrite drifted weeks with recomputed values')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    paths = sorted(glob.glob(os.path.join(args.directory, 'league_*.json')))
+    workers = args.workers or os.cpu_count() or 1
+    chunk = max(1, len(paths) // (4 * workers))
+    drifted = failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, drift, error in pool.map(audit_file, paths, itertools.repeat(args.fix), chunksize=chunk):
+            name = os.path.basename(path)
+            if error:
+                failed += 1
+                print(f'{name}: error: {error}')
+            elif drift:
+                drifted += 1
+                print(f"{name}: {len(drift)} weeks drifted{' (fixed)' if args.fix else ''}")
+                print('\n'.join(describe(drift)))
+    print(f'{len(paths)} leagues audited, {drifted} with drift, {failed} failed')
+    return 1 if failed or (drifted and not args.fix) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,300 @@
+import argparse, asyncio, csv, json, os, random, sys, tempfile, time, tracemalloc
+from scoring import points_for, compute_final_scores, compute_allowances
+
+# Offline benchmarks for the bot's commands.
+#
+#   python bench.py --players 12 --weeks 30 --games 4 --cards 100000
+#
+# Generates a synthetic league in the league_*.json / cards_*.csv formats
+# inside a scratch directory, imports mtg_league from there, and drives the
+# command coroutines through .callback(ctx, ...) with stub Discord objects
+# and a local mock Scryfall server (aiohttp.web on 127.0.0.1). Prints
+# latency percentiles and peak traced memory per scenario.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GUILD_ID = 1000
+CHANNEL_ID = 2000
+CARD_NAMES = ['Brainstorm', 'Lightning Bolt', 'Counterspell', 'Swords to Plowshares',
+              'Dark Ritual', 'Llanowar Elves', 'Sol Ring', 'Ponder', 'Thoughtseize']
+
+# --- Synthetic league ---
+
+def make_week(players: list, games: int, rnd) -> dict:
+    n = len(players)
+    week = {'games': {}, 'finalized': True, 'num_games': games, 'card_additions': {}}
+    for g in range(1, games + 1):
+        order = rnd.sample(players, n)
+        week['games'][str(g)] = {p: {'placement': i, 'points': points_for(i, n)}
+                                 for i, p in enumerate(order, 1)}
+    week['final_scores'] = compute_final_scores(week)
+    week['allowances'] = compute_allowances(week, players)
+    return week
+
+# Writes league_<guild>_<slug>.json and cards_<guild>_<slug>.csv. Player 0
+# (the benchmark's command author) also gets `spare` cards in the last week
+# for !removecard to work through.
+
+def generate_league(directory: str, slug: str, players: int, weeks: int, games: int,
+                    cards: int, spare: int = 0, seed: int = 1):
+    rnd = random.Random(seed)
+    pids = [str(10 ** 17 + i) for i in range(players)]
+    data = {'league_name': slug, 'players': [int(p) for p in pids], 'weeks': {}}
+    for w in range(1, weeks + 1):
+        data['weeks'][str(w)] = make_week(pids, games, rnd)
+    rows = []
+    for i in range(cards):
+        wk, uid = str(rnd.randint(1, weeks)), rnd.choice(pids)
+        rows.append([wk, uid, rnd.choice(CARD_NAMES), str(500000 + i), f'{rnd.uniform(0.1, 5):.2f}'])
+    rows += [[str(weeks), pids[0], rnd.choice(CARD_NAMES), str(900000 + i), '0.25'] for i in range(spare)]
+    for wk, uid, name, _, price in rows:
+        data['weeks'][wk]['card_additions'].setdefault(uid, []).append(f'{name} (${price})')
+    with open(os.path.join(directory, f'league_{GUILD_ID}_{slug}.json'), 'w') as f:
+        json.dump(data, f)
+    with open(os.path.join(directory, f'cards_{GUILD_ID}_{slug}.csv'), 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['week', 'user_id', 'card_name', 'tcgplayer_id', 'price'])
+        w.writerows(rows)
+    return pids
+
+# --- Stub Discord objects: just what the commands touch ---
+
+class FakeMessage:
+    next_id = 1
+
+    def __init__(self, channel, content='', author=None, embed=None):
+        self.id = FakeMessage.next_id
+        FakeMessage.next_id += 1
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.author = author
+        self.embed = embed
+        self.mentions = []
+
+    async def add_reaction(self, emoji):
+        pass
+
+    async def edit(self, **kwargs):
+        pass
+
+    async def delete(self):
+        pass
+
+class FakeMember:
+    bot = False
+
+    def __init__(self, guild, uid: int):
+        self.guild = guild
+        self.id = uid
+        self.display_name = f'Player {uid % 1000}'
+        self.mention = f'<@{uid}>'
+
+class FakeGuild:
+    def __init__(self, gid: int):
+        self.id = gid
+
+    def get_member(self, uid: int):
+        return FakeMember(self, uid)
+
+    async def query_members(self, user_ids=None, limit=None, cache=False):
+        return [FakeMember(self, u) for u in user_ids]
+
+class FakeChannel:
+    def __init__(self, cid: int, guild):
+        self.id = cid
+        self.guild = guild
+        self.sent = 0
+        self.replies = []
+        self.replier = None
+
+    # Each bot message is answered with the next scripted reply, if any
+
+    async def send(self, content=None, *, embed=None, view=None):
+        self.sent += 1
+        if self.replies and self.replier is not None:
+            self.replier(self.replies.pop(0))
+        return FakeMessage(self, content or '', embed=embed)
+
+    async def delete_messages(self, messages):
+        pass
+
+    def get_partial_message(self, mid):
+        return FakeMessage(self)
+
+class FakeContext:
+    def __init__(self, channel, author, league):
+        self.guild = channel.guild
+        self.channel = channel
+        self.author = author
+        self.league = league
+        self.message = FakeMessage(channel, author=author)
+
+# Chat prompts answered from a script instead of the gateway: replies go
+# through the same dispatch as on_message
+
+def scripted_replies(channel, author, prompts):
+    channel.replier = lambda text: prompts.dispatch(FakeMessage(channel, text, author=author))
+    return channel.replies
+
+# --- Mock Scryfall ---
+
+# Collection price of a tcgplayer id: deterministic, so checks can predict it
+
+def mock_price(tcg: int) -> str:
+    return f'{1 + tcg % 7 / 4:.2f}'
+
+# fail_from: /cards/collection answers 503 for chunks holding an id >= it
+
+async def start_mock_scryfall(fail_from: int = None):
+    from aiohttp import web
+
+    async def search(request):
+        q = request.query.get('q', '')
+        data = [{'object': 'card', 'name': f'{q} {i}', 'tcgplayer_id': 700000 + i}
+                for i in range(3)]
+        return web.json_response({'object': 'list', 'total_cards': len(data), 'data': data})
+
+    async def tcg(request):
+        return web.json_response({'object': 'card', 'tcgplayer_id': int(request.match_info['id']),
+                                  'prices': {'usd': '0.10'}})
+
+    async def collection(request):
+        ids = [i['tcgplayer_id'] for i in (await request.json())['identifiers']]
+        if fail_from is not None and max(ids) >= fail_from:
+            return web.json_response({'object': 'error', 'status': 503}, status=503)
+        return web.json_response({'object': 'list', 'not_found': [], 'data': [
+            {'object': 'card', 'name': f'Card {i}', 'tcgplayer_id': i, 'prices': {'usd': mock_price(i)}}
+            for i in ids]})
+
+    app = web.Application()
+    app.router.add_get('/cards/search', search)
+    app.router.add_get('/cards/tcgplayer/{id}', tcg)
+    app.router.add_post('/cards/collection', collection)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f'http://{host}:{port}'
+
+# --- Measurement ---
+
+def percentile(sorted_vals: list, q: float) -> float:
+    return sorted_vals[min(len(sorted_vals) - 1, int(q * len(sorted_vals)))]
+
+async def measure(name: str, runs: int, fn, results: list):
+    times = []
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    for i in range(runs):
+        t0 = time.perf_counter()
+        await fn(i)
+        times.append((time.perf_counter() - t0) * 1000)
+    peak = tracemalloc.get_traced_memory()[1] - base
+    times.sort()
+    results.append((name, runs, percentile(times, 0.5), percentile(times, 0.9),
+                    percentile(times, 0.99), times[-1], peak / 2 ** 20))
+
+def report(results: list, out=sys.stdout):
+    print(f"{'scenario':<18}{'runs':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'peak MiB':>10}", file=out)
+    for name, runs, p50, p90, p99, mx, peak in results:
+        print(f'{name:<18}{runs:>6}{p50:>10.2f}{p90:>10.2f}{p99:>10.2f}{mx:>10.2f}{peak:>10.2f}', file=out)
+
+async def run(args):
+    slug = 'bench'
+    pids = generate_league('.', slug, args.players, args.weeks, args.games, args.cards,
+                           spare=args.runs)
+    sys.path.insert(0, HERE)
+    import mtg_league as mtg
+    from scryfall import TokenBucket
+
+    runner, url = await start_mock_scryfall()
+    mtg.scryfall.base_url = url
+    mtg.scryfall.bucket = TokenBucket(1e6)
+    mtg.scryfall.search_cache = mtg.scryfall.price_cache = None
+    delete_task = asyncio.create_task(mtg.tracker.run())
+
+    guild = FakeGuild(GUILD_ID)
+    channel = FakeChannel(CHANNEL_ID, guild)
+    author = FakeMember(guild, int(pids[0]))
+    other = FakeMember(guild, int(pids[-1]))
+    replies = scripted_replies(channel, author, mtg.prompts)
+    results = []
+
+    async def load(i):
+        lg = await mtg.storage.open(str(GUILD_ID), slug)
+        lg.close()
+    await measure('load_league', args.load_runs, load, results)
+
+    await mtg.registry.activate(GUILD_ID, slug, CHANNEL_ID)
+    lg = await mtg.registry.get(GUILD_ID, CHANNEL_ID)
+    mtg.registry.pin(lg)
+    ctx = FakeContext(channel, author, lg)
+
+    await measure('view_league', args.runs, lambda i: mtg.view_league.callback(ctx), results)
+    await measure('view_cards', args.runs, lambda i: mtg.view_cards.callback(ctx, other), results)
+
+    async def add_card(i):
+        replies[:] = [f'card{i}', '1']
+        await mtg.add_card.callback(ctx)
+    await measure('add_card', args.runs, add_card, results)
+
+    async def remove_card(i):
+        replies[:] = ['1']
+        await mtg.remove_card.callback(ctx)
+    await measure('remove_card', args.runs, remove_card, results)
+
+    # Each run opens a new week, records its games and finalizes it
+    rnd = random.Random(2)
+
+    async def finalize(i):
+        week = str(len(lg.data['weeks']) + 1)
+        async with lg.lock:
+            lg.record({'op': 'week_opened', 'week': week, 'num_games': args.games})
+            for g, game in make_week(pids, args.games, rnd)['games'].items():
+                lg.record({'op': 'game_recorded', 'week': week, 'game': g, 'responses': game})
+        await mtg.finalize_week_procedures(lg, channel, week)
+
+    await measure('finalize_week', args.runs, finalize, results)
+    await measure('revalue', args.load_runs,
+                  lambda i: mtg.revalue(lg.ledger, mtg.scryfall, lock=lg.lock, standings=lg.standings), results)
+    await measure('save_league', args.load_runs, lambda i: lg.store.compact(), results)
+
+    mtg.registry.unpin(lg)
+    await mtg.registry.close()
+    await mtg.tracker.flush()
+    delete_task.cancel()
+    mtg.storage.close()
+    await mtg.scryfall.close()
+    await runner.cleanup()
+    return results
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark league commands offline')
+    ap.add_argument('--players', type=int, default=8)
+    ap.add_argument('--weeks', type=int, default=20)
+    ap.add_argument('--games', type=int, default=3, help='games per week')
+    ap.add_argument('--cards', type=int, default=10000, help='card ledger rows')
+    ap.add_argument('--runs', type=int, default=50, help='runs per command scenario')
+    ap.add_argument('--load-runs', type=int, default=5, help='runs for load/save')
+    ap.add_argument('--output', help='also write the report to this file')
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        os.environ['SCRYFALL_CACHE'] = os.path.join(scratch, 'cache.sqlite3')
+        os.environ.pop('SCRYFALL_BULK_INDEX', None)
+        os.environ.pop('LEAGUE_STORAGE', None)
+        tracemalloc.start()
+        results = asyncio.run(run(args))
+        tracemalloc.stop()
+        os.chdir(HERE)
+
+    print(f'{args.players} players, {args.weeks} weeks, {args.games} games/week, {args.cards} card rows')
+    report(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            report(results, f)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import json, sqlite3, time
+from collections import OrderedDict
+
+# On-disk backing store shared by every TTLCache namespace.
+# Rows carry their own expiry so a restart keeps whatever is still fresh.
+
+class CacheStore:
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            ' ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,'
+            ' expires REAL NOT NULL, PRIMARY KEY (ns, key))'
+        )
+        self.conn.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        self.conn.commit()
+
+    def get(self, ns: str, key: str):
+        row = self.conn.execute(
+            'SELECT value, expires FROM cache WHERE ns = ? AND key = ?', (ns, key)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def put(self, ns: str, key: str, value, expires: float):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO cache (ns, key, value, expires) VALUES (?, ?, ?, ?)',
+            (ns, key, json.dumps(value), expires)
+        )
+        self.conn.commit()
+
+    def delete(self, ns: str, key: str):
+        self.conn.execute('DELETE FROM cache WHERE ns = ? AND key = ?', (ns, key))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+# In-memory LRU with per-entry TTL, optionally backed by a CacheStore.
+# Misses in memory fall through to disk; disk hits are promoted back into the LRU.
+
+class TTLCache:
+    def __init__(self, ns: str, ttl: float, maxsize: int = 1024, store: CacheStore = None):
+        self.ns = ns
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.store = store
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def get(self, key: str):
+        now = time.time()
+        entry = self.entries.get(key)
+        if entry is not None:
+            value, expires = entry
+            if expires > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self.entries[key]
+        if self.store is not None:
+            row = self.store.get(self.ns, key)
+            if row is not None:
+                value, expires = row
+                if expires > now:
+                    self._remember(key, value, expires)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+                self.store.delete(self.ns, key)
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value, ttl: float = None):
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        self._remember(key, value, expires)
+        if self.store is not None:
+            self.store.put(self.ns, key, value, expires)
+
+    def _remember(self, key, value, expires):
+        self.entries[key] = (value, expires)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'disk_hits': self.disk_hits,
+            'size': len(self.entries),
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,236 @@
+import asyncio, json, logging, os, re, sqlite3, tempfile
+from contextlib import closing
+import aiohttp
+
+log = logging.getLogger(__name__)
+
+# Local card index built from Scryfall's default_cards bulk file.
+# cards: one row per oracle card (latest printing with a TCGplayer id), searchable via FTS5
+# prints: every printing keyed by tcgplayer_id, for price lookups
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE cards (
+    id INTEGER PRIMARY KEY,
+    oracle_id TEXT UNIQUE NOT NULL,
+    name TEXT NOT NULL,
+    oracle_text TEXT NOT NULL,
+    tcgplayer_id INTEGER,
+    released TEXT NOT NULL
+);
+CREATE TABLE prints (tcgplayer_id INTEGER PRIMARY KEY, name TEXT NOT NULL, usd TEXT);
+CREATE VIRTUAL TABLE cards_fts USING fts5(name, oracle_text, content='cards', content_rowid='id');
+"""
+
+MAX_RESULTS = 175
+
+# Stream the elements of a top-level JSON array without loading the whole file
+
+def iter_json_array(fp, chunk_size: int = 1 << 20):
+    decoder = json.JSONDecoder()
+    buf, pos = '', 0
+
+    def refill():
+        nonlocal buf, pos
+        more = fp.read(chunk_size)
+        if not more:
+            raise ValueError('Unexpected end of bulk data file')
+        buf, pos = buf[pos:] + more, 0
+
+    refill()
+    while True:
+        while pos < len(buf) and buf[pos].isspace():
+            pos += 1
+        if pos < len(buf):
+            break
+        refill()
+    if buf[pos] != '[':
+        raise ValueError('Bulk data file is not a JSON array')
+    pos += 1
+    while True:
+        while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ','):
+            pos += 1
+        if pos == len(buf):
+            refill()
+            continue
+        if buf[pos] == ']':
+            return
+        while True:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+                break
+            except json.JSONDecodeError:
+                refill()
+        yield obj
+        pos = end
+
+def _oracle_text(card: dict) -> str:
+    if 'oracle_text' in card:
+        return card['oracle_text']
+    return '\n'.join(f.get('oracle_text', '') for f in card.get('card_faces', []))
+
+# Parse a bulk file into a fresh index database at dest (replaced atomically)
+
+def build_index(bulk_path: str, dest: str, updated_at: str = ''):
+    fd, tmp = tempfile.mkstemp(suffix='.sqlite3', dir=os.path.dirname(os.path.abspath(dest)))
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(tmp)
+        conn.executescript(SCHEMA)
+        with open(bulk_path, encoding='utf-8') as fp:
+            for card in iter_json_array(fp):
+                if card.get('layout') in ('token', 'double_faced_token', 'emblem', 'art_series'):
+                    continue
+                tcg = card.get('tcgplayer_id')
+                if tcg:
+                    conn.execute(
+                        'INSERT OR REPLACE INTO prints (tcgplayer_id, name, usd) VALUES (?, ?, ?)',
+                        (tcg, card['name'], card.get('prices', {}).get('usd'))
+                    )
+                conn.execute(
+                    'INSERT INTO cards (oracle_id, name, oracle_text, tcgplayer_id, released)'
+                    ' VALUES (?, ?, ?, ?, ?)'
+                    ' ON CONFLICT (oracle_id) DO UPDATE SET'
+                    '  name = excluded.name, oracle_text = excluded.oracle_text,'
+                    '  tcgplayer_id = excluded.tcgplayer_id, released = excluded.released'
+                    ' WHERE excluded.tcgplayer_id IS NOT NULL'
+                    '  AND (cards.tcgplayer_id IS NULL OR excluded.released > cards.released)',
+                    (card.get('oracle_id') or card['id'], card['name'], _oracle_text(card),
+                     tcg, card.get('released_at', ''))
+                )
+        conn.execute("INSERT INTO cards_fts (cards_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO meta (key, value) VALUES ('updated_at', ?)", (updated_at,))
+        conn.commit()
+        conn.close()
+        os.replace(tmp, dest)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+# Translate a plain Scryfall query into FTS5. Bare words match the name,
+# o:/oracle: words match rules text; anything fancier returns None so the
+# caller falls back to the API.
+
+def fts_query(query: str):
+    clauses = []
+    for part in query.split():
+        m = re.fullmatch(r'(?:o|oracle):(.+)', part, re.I)
+        column, text = ('oracle_text', m.group(1)) if m else ('name', part)
+        if re.search(r'[:<>=!()]', text):
+            return None
+        clauses += [f'{column} : "{w}"*' for w in re.findall(r'\w+', text)]
+    return ' AND '.join(clauses) or None
+
+class CardIndex:
+    def __init__(self, path: str, bulk_file: str = None):
+        self.path = path
+        self.bulk_file = bulk_file
+        self.conn = None
+        self._reopen()
+
+    @property
+    def ready(self) -> bool:
+        return self.conn is not None
+
+    def _reopen(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        if os.path.exists(self.path):
+            self.conn = sqlite3.connect(self.path)
+
+    def updated_at(self) -> str:
+        if not self.ready:
+            return ''
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'updated_at'").fetchone()
+        return row[0] if row else ''
+
+    # Scryfall-shaped search result, or None when the index can't answer
+
+    def search(self, query: str):
+        if not self.ready:
+            return None
+        q = fts_query(query)
+        if q is None:
+            return None
+        rows = self.conn.execute(
+            'SELECT c.name, c.tcgplayer_id FROM cards_fts f JOIN cards c ON c.id = f.rowid'
+            ' WHERE cards_fts MATCH ? ORDER BY c.name LIMIT ?', (q, MAX_RESULTS)
+        ).fetchall()
+        return {
+            'object': 'list',
+            'total_cards': len(rows),
+            'data': [{'name': n, 'tcgplayer_id': t} for n, t in rows],
+        }
+
+    # Latest printing of a card by exact name, shaped like get_tcg's result
+
+    def named(self, name: str):
+        if not self.ready:
+            return None
+        row = self.conn.execute(
+            'SELECT c.name, c.tcgplayer_id, p.usd FROM cards c'
+            ' LEFT JOIN prints p ON p.tcgplayer_id = c.tcgplayer_id'
+            ' WHERE c.name = ? COLLATE NOCASE AND c.tcgplayer_id IS NOT NULL', (name,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'name': row[0], 'tcgplayer_id': row[1], 'prices': {'usd': row[2]}}
+
+    # Opens its own connection, so it can be called from a worker thread
+
+    def names(self) -> list:
+        if not self.ready:
+            return []
+        with closing(sqlite3.connect(self.path)) as conn:
+            return [n for n, in conn.execute('SELECT name FROM cards')]
+
+    def get_tcg(self, card_id: int):
+        if not self.ready:
+            return None
+        row = self.conn.execute(
+            'SELECT name, usd FROM prints WHERE tcgplayer_id = ?', (card_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'name': row[0], 'tcgplayer_id': card_id, 'prices': {'usd': row[1]}}
+
+    # Rebuild from a local bulk file, or download the latest default_cards
+    # when Scryfall reports a newer one than the index holds
+
+    async def refresh(self, client):
+        if self.bulk_file:
+            if not self.ready:
+                await asyncio.to_thread(build_index, self.bulk_file, self.path)
+                self._reopen()
+            return
+        meta = await client.request('GET', '/bulk-data/default-cards')
+        if meta.get('updated_at', '') <= self.updated_at():
+            return
+        fd, tmp = tempfile.mkstemp(suffix='.json', dir=os.path.dirname(os.path.abspath(self.path)))
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                timeout = aiohttp.ClientTimeout(total=None, sock_read=60)
+                async with client.session.get(meta['download_uri'], timeout=timeout) as resp:
+                    resp.raise_for_status()
+                    async for chunk in resp.content.iter_chunked(1 << 20):
+                        await asyncio.to_thread(out.write, chunk)
+            await asyncio.to_thread(build_index, tmp, self.path, meta['updated_at'])
+        finally:
+            os.remove(tmp)
+        self._reopen()
+
+    async def refresh_forever(self, client, interval: float = 24 * 3600):
+        while True:
+            try:
+                await self.refresh(client)
+            except Exception as e:
+                log.warning('Card index refresh failed: %r', e)
+            if self.bulk_file:
+                return
+            await asyncio.sleep(interval)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,222 @@
+import csv, os, time
+from metrics import metrics, BYTES
+
+CARD_FIELDS = ['week', 'user_id', 'card_name', 'tcgplayer_id', 'price']
+
+# In-memory card ledger for one league, loaded once.
+# Entries are indexed by user and by week with running per-user totals.
+# Subclasses persist rows: _append() stores a row and returns its backend
+# key (CSV line, SQLite rowid), _delete() drops it again, _reprice() stores
+# new prices for existing rows and save() writes out anything deferred.
+
+class CardLedger:
+    def __init__(self):
+        self.entries = {}   # entry id -> row dict (card fields + 'id')
+        self.keys = {}      # entry id -> backend key
+        self.by_user = {}   # user_id -> week -> [entry ids]
+        self.by_week = {}   # week -> user_id -> [entry ids]
+        self.totals = {}    # user_id -> [card count, total price]
+        self.by_tcg = {}    # tcgplayer_id -> [entry ids]
+        self.next_id = 0
+        self.version = 0    # bumped on every add/remove
+
+    def _append(self, row: dict):
+        raise NotImplementedError
+
+    def _delete(self, row: dict, key):
+        raise NotImplementedError
+
+    def _reprice(self, rows: list):
+        raise NotImplementedError
+
+    def save(self):
+        pass
+
+    def _index(self, row, key):
+        eid = self.next_id
+        self.next_id += 1
+        row = {k: row[k] for k in CARD_FIELDS}
+        row['id'] = eid
+        self.entries[eid] = row
+        self.keys[eid] = key
+        uid, wk = row['user_id'], row['week']
+        self.by_user.setdefault(uid, {}).setdefault(wk, []).append(eid)
+        self.by_week.setdefault(wk, {}).setdefault(uid, []).append(eid)
+        self.by_tcg.setdefault(row['tcgplayer_id'], []).append(eid)
+        tot = self.totals.setdefault(uid, [0, 0.0])
+        tot[0] += 1
+        tot[1] += float(row['price'])
+        self.version += 1
+        return row
+
+    def _unindex(self, eid):
+        row = self.entries.pop(eid)
+        del self.keys[eid]
+        uid, wk = row['user_id'], row['week']
+        self.by_user[uid][wk].remove(eid)
+        self.by_week[wk][uid].remove(eid)
+        self.by_tcg[row['tcgplayer_id']].remove(eid)
+        tot = self.totals[uid]
+        tot[0] -= 1
+        tot[1] -= float(row['price'])
+        self.version += 1
+        return row
+
+    # --- Queries ---
+
+    def usage(self, user_id: str):
+        count, price = self.totals.get(user_id, (0, 0.0))
+        return count, price
+
+    def user_entries(self, user_id: str, week: str = None) -> list:
+        weeks = self.by_user.get(user_id, {})
+        if week is not None:
+            return [self.entries[e] for e in weeks.get(week, [])]
+        return [self.entries[e] for ids in weeks.values() for e in ids]
+
+    def user_weeks(self, user_id: str) -> dict:
+        return {wk: [self.entries[e] for e in ids]
+                for wk, ids in self.by_user.get(user_id, {}).items() if ids}
+
+    def active_weeks(self, user_id: str) -> list:
+        return sorted((wk for wk, ids in self.by_user.get(user_id, {}).items() if ids), key=int)
+
+    def tcgplayer_ids(self) -> list:
+        return [tcg for tcg, ids in self.by_tcg.items() if ids]
+
+    def week_entries(self, week: str) -> dict:
+        return {uid: [self.entries[e] for e in ids]
+                for uid, ids in self.by_week.get(week, {}).items() if ids}
+
+    def __iter__(self):
+        return iter(self.entries.values())
+
+    def __len__(self):
+        return len(self.entries)
+
+    # --- Mutations ---
+
+    def add(self, week: str, user_id: str, card_name: str, tcgplayer_id, price: float) -> dict:
+        row = {'week': str(week), 'user_id': str(user_id), 'card_name': card_name,
+               'tcgplayer_id': str(tcgplayer_id), 'price': f"{price:.2f}"}
+        return self._index(row, self._append(row))
+
+    def remove(self, entry_id: int):
+        if entry_id not in self.entries:
+            return None
+        key = self.keys[entry_id]
+        row = self._unindex(entry_id)
+        self._delete(row, key)
+        return row
+
+    # Set the price of every card with a given tcgplayer id.
+    # prices: {tcgplayer_id: float}; returns [(row, old price)] for rows that changed.
+
+    def reprice(self, prices: dict) -> list:
+        changed = []
+        for tcg, price in prices.items():
+            new = f"{price:.2f}"
+            for eid in self.by_tcg.get(str(tcg), []):
+                row = self.entries[eid]
+                if row['price'] == new:
+                    continue
+                old = row['price']
+                self.totals[row['user_id']][1] += float(new) - float(old)
+                row['price'] = new
+                changed.append((row, old))
+        if changed:
+            self.version += 1
+            self._reprice([row for row, _ in changed])
+        return changed
+
+def row_key(row) -> tuple:
+    return tuple(row[k] for k in CARD_FIELDS)
+
+# Ledger over cards_<guild>_<league>.csv. Additions are appended to the
+# CSV; removals are appended to a <csv>.tombstones sidecar and folded into
+# the CSV on compaction. Each tombstone records the row it kills, so a
+# stale sidecar left behind by an interrupted compaction can't remove the
+# wrong row. A readonly ledger never touches the files (audits run beside
+# the live bot).
+
+class CsvCardLedger(CardLedger):
+    def __init__(self, path: str, compact_threshold: int = 64, readonly: bool = False):
+        super().__init__()
+        self.path = path
+        self.readonly = readonly
+        self.tomb_path = path + '.tombstones'
+        self.compact_threshold = compact_threshold
+        self.tombstones = 0
+        self.next_line = 0
+        self.stale = False
+        self._load()
+
+    def _load(self):
+        t0 = time.perf_counter()
+        if not os.path.exists(self.path):
+            if self.readonly:
+                return
+            with open(self.path, 'w', newline='') as f:
+                csv.writer(f).writerow(CARD_FIELDS)
+        dead = set()
+        if os.path.exists(self.tomb_path):
+            with open(self.tomb_path, newline='') as f:
+                dead = {(int(r[0]), tuple(r[1:])) for r in csv.reader(f) if r}
+        with open(self.path, newline='') as f:
+            for line, row in enumerate(csv.DictReader(f)):
+                self.next_line = line + 1
+                if (line, row_key(row)) in dead:
+                    self.tombstones += 1
+                    continue
+                self._index(row, line)
+        metrics.observe('csv_read_seconds', time.perf_counter() - t0)
+        metrics.observe('csv_read_bytes', os.path.getsize(self.path), buckets=BYTES)
+        if self.tombstones and not self.readonly:
+            self.compact()
+
+    def _append(self, row):
+        with open(self.path, 'a', newline='') as f:
+            csv.writer(f).writerow(row_key(row))
+        self.next_line += 1
+        return self.next_line - 1
+
+    # A CSV row can't be rewritten in place; repricing marks the file stale
+    # and save() rewrites it once, however many chunks were repriced
+
+    def _reprice(self, rows):
+        self.stale = True
+
+    def save(self):
+        if self.stale:
+            self.compact()
+
+    def _delete(self, row, line):
+        if self.stale:
+            # tombstones must match the rows on disk, so write out the new prices instead
+            self.compact()
+            return
+        with open(self.tomb_path, 'a', newline='') as f:
+            csv.writer(f).writerow([line, *row_key(row)])
+        self.tombstones += 1
+        if self.tombstones >= self.compact_threshold:
+            self.compact()
+
+    # Rewrite the CSV without tombstoned rows, atomically, then drop the sidecar
+
+    def compact(self):
+        tmp = self.path + '.tmp'
+        live = sorted(self.entries, key=self.keys.__getitem__)
+        with open(tmp, 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(CARD_FIELDS)
+            for line, eid in enumerate(live):
+                w.writerow(row_key(self.entries[eid]))
+                self.keys[eid] = line
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        if os.path.exists(self.tomb_path):
+            os.remove(self.tomb_path)
+        self.tombstones = 0
+        self.next_line = len(live)
+        self.stale = False
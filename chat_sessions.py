@@ -0,0 +1,91 @@
+import asyncio
+from collections import deque
+
+# Interactive prompts (search term, numbered menus) as bounded sessions
+# instead of bot.wait_for listeners. There is at most one session per
+# (channel, user): opening a new one ends the old. Each reply wait times
+# out, "cancel" ends the session, and at most max_sessions are open at
+# once. A single on_message listener hands each message to its session
+# with one dict lookup.
+
+class SessionEnded(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason   # 'timeout', 'cancelled' or 'replaced'
+
+class ChatSession:
+    def __init__(self, key, timeout: float):
+        self.key = key
+        self.timeout = timeout
+        self.ended = None
+        self.waiter = None
+        self.buffered = deque(maxlen=4)
+
+    def feed(self, message):
+        if message.content.strip().lower() == 'cancel':
+            self.end('cancelled')
+        elif self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(message)
+        else:
+            self.buffered.append(message)
+
+    def end(self, reason: str):
+        if self.ended is None:
+            self.ended = reason
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_exception(SessionEnded(reason))
+
+    # Next message from the user; raises SessionEnded on timeout, cancel or replacement
+
+    async def reply(self):
+        if self.ended is not None:
+            raise SessionEnded(self.ended)
+        if self.buffered:
+            return self.buffered.popleft()
+        self.waiter = asyncio.get_running_loop().create_future()
+        try:
+            return await asyncio.wait_for(self.waiter, self.timeout)
+        except asyncio.TimeoutError:
+            self.end('timeout')
+            raise SessionEnded('timeout') from None
+        finally:
+            self.waiter = None
+
+class ChatSessions:
+    def __init__(self, max_sessions: int = 200, timeout: float = 120, prefix: str = '!'):
+        self.sessions = {}   # (channel id, user id) -> ChatSession
+        self.max_sessions = max_sessions
+        self.timeout = timeout
+        self.prefix = prefix
+
+    # None when the cap is reached
+
+    def open(self, channel_id: int, user_id: int):
+        key = (channel_id, user_id)
+        old = self.sessions.pop(key, None)
+        if old is not None:
+            old.end('replaced')
+        elif len(self.sessions) >= self.max_sessions:
+            return None
+        session = self.sessions[key] = ChatSession(key, self.timeout)
+        return session
+
+    def close(self, session):
+        if self.sessions.get(session.key) is session:
+            del self.sessions[session.key]
+        session.end('closed')
+
+    # Route a message to its session; commands are left for the bot (a new
+    # command replaces the session rather than answering it)
+
+    def dispatch(self, message) -> bool:
+        if message.author.bot or message.content.startswith(self.prefix):
+            return False
+        session = self.sessions.get((message.channel.id, message.author.id))
+        if session is None:
+            return False
+        session.feed(message)
+        return True
+
+    def __len__(self):
+        return len(self.sessions)
@@ -0,0 +1,305 @@
+import asyncio, os, sys, tempfile, traceback
+
+# Offline correctness checks for the riskier persistence and Scryfall code.
+# Each check runs in a fresh scratch directory with small fixtures; HTTP
+# goes to bench.py's mock Scryfall on 127.0.0.1. No bot token is needed.
+#
+#   python checks.py [name ...]
+#
+# A check fails by raising (plain asserts); the exit status is 1 if any did.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+CHECKS = {}
+
+def check(fn):
+    CHECKS[fn.__name__[len('check_'):]] = fn
+    return fn
+
+# --- Bulk-data card index ---
+
+# A few default_cards entries: two printings of one card (the newer one
+# wins), a double-faced card, a token (skipped) and a card with no price
+DEFAULT_CARDS = [
+    {'id': 'a1', 'oracle_id': 'o-bolt', 'name': 'Lightning Bolt', 'layout': 'normal',
+     'oracle_text': 'Lightning Bolt deals 3 damage to any target.', 'tcgplayer_id': 101,
+     'released_at': '1993-08-05', 'prices': {'usd': '2.50'}},
+    {'id': 'a2', 'oracle_id': 'o-bolt', 'name': 'Lightning Bolt', 'layout': 'normal',
+     'oracle_text': 'Lightning Bolt deals 3 damage to any target.', 'tcgplayer_id': 102,
+     'released_at': '2021-06-18', 'prices': {'usd': '1.25'}},
+    {'id': 'b1', 'oracle_id': 'o-delver', 'name': 'Delver of Secrets // Insectile Aberration',
+     'layout': 'transform', 'tcgplayer_id': 201, 'released_at': '2011-09-30',
+     'card_faces': [{'oracle_text': 'Look at the top card of your library.'},
+                    {'oracle_text': 'Flying'}], 'prices': {'usd': '0.30'}},
+    {'id': 'c1', 'oracle_id': 'o-goblin', 'name': 'Goblin', 'layout': 'token',
+     'tcgplayer_id': 301, 'released_at': '2020-01-01', 'prices': {'usd': '0.10'}},
+    {'id': 'd1', 'oracle_id': 'o-ponder', 'name': 'Ponder', 'layout': 'normal',
+     'oracle_text': 'Look at the top three cards of your library.', 'tcgplayer_id': 401,
+     'released_at': '2008-02-01', 'prices': {'usd': None}},
+]
+
+@check
+def check_card_index():
+    import io, json
+    from card_index import CardIndex, build_index, fts_query, iter_json_array
+
+    text = '  [\n' + ',\n  '.join(json.dumps(c) for c in DEFAULT_CARDS) + '\n]\n'
+    for size in (1, 7, 64, 1 << 20):
+        assert list(iter_json_array(io.StringIO(text), chunk_size=size)) == DEFAULT_CARDS, size
+    assert list(iter_json_array(io.StringIO('[]'))) == []
+    for bad in ('{"a": 1}', '[{"a": 1},'):
+        try:
+            list(iter_json_array(io.StringIO(bad)))
+            raise AssertionError(f'accepted {bad!r}')
+        except ValueError:
+            pass
+
+    assert fts_query('lightning bolt') == 'name : "lightning"* AND name : "bolt"*'
+    assert fts_query('o:damage') == 'oracle_text : "damage"*'
+    assert fts_query('t:instant cmc<2') is None
+    assert fts_query('   ') is None
+
+    with open('default_cards.json', 'w') as f:
+        f.write(text)
+    build_index('default_cards.json', 'index.sqlite3', '2024-01-01')
+    index = CardIndex('index.sqlite3')
+    try:
+        assert index.updated_at() == '2024-01-01'
+        res = index.search('bolt')
+        assert res['data'] == [{'name': 'Lightning Bolt', 'tcgplayer_id': 102}], res
+        assert [c['name'] for c in index.search('o:library')['data']] == \
+            ['Delver of Secrets // Insectile Aberration', 'Ponder']
+        assert index.search('goblin')['data'] == []
+        assert index.search('t:instant') is None
+        assert index.named('lightning bolt') == \
+            {'name': 'Lightning Bolt', 'tcgplayer_id': 102, 'prices': {'usd': '1.25'}}
+        assert index.get_tcg(101)['prices']['usd'] == '2.50'
+        assert index.get_tcg(301) is None
+        assert sorted(index.names()) == ['Delver of Secrets // Insectile Aberration',
+                                         'Lightning Bolt', 'Ponder']
+    finally:
+        index.close()
+
+# --- League journal ---
+
+@check
+async def check_journal():
+    import json
+    from journal import JournaledStore, load_state, journal_path, reconstruct
+
+    def strip(state):
+        return {k: v for k, v in state.items() if k != 'journal_seq'}
+
+    state = {}
+    store = JournaledStore('league.json', state, compact_bytes=1 << 20, delay=0)
+    store.record({'op': 'create', 'league_name': 'L', 'players': [1, 2]})
+    await store.flush()
+    after_create = json.loads(json.dumps(strip(state)))
+    store.record({'op': 'week_opened', 'week': '1', 'num_games': 1})
+    store.record({'op': 'game_recorded', 'week': '1', 'game': '1',
+                  'responses': {'1': {'placement': 1, 'points': 3}, '2': {'placement': 2, 'points': 0}}})
+    store.close()
+    # crash before the next snapshot: the journal tail is replayed
+    assert load_state('league.json') == state
+
+    # a torn final line is ignored, and the next append continues the sequence
+    with open(journal_path('league.json'), 'a') as f:
+        f.write('{"seq": 99, "op": "week_op')
+    assert load_state('league.json') == state
+    state = load_state('league.json')
+    store = JournaledStore('league.json', state, compact_bytes=1, delay=0)
+    ev = store.record({'op': 'score_edited', 'week': '1', 'game': '1', 'user_id': '2',
+                       'placement': 1, 'points': 3})
+    assert ev['seq'] == 4, ev
+    # past compact_bytes the journal is folded into the snapshot and archived
+    await store.flush()
+    store.close()
+    assert os.path.getsize(journal_path('league.json')) == 0
+    assert load_state('league.json') == state
+    assert strip(reconstruct('league.json', upto_seq=1)) == after_create
+    assert reconstruct('league.json') == strip(state)
+
+    # a league saved before the journal existed is seeded with a base event
+    with open('old.json', 'w') as f:
+        json.dump(after_create, f)
+    old = load_state('old.json')
+    store = JournaledStore('old.json', old, delay=0)
+    store.close()
+    with open(journal_path('old.json')) as f:
+        assert json.loads(f.readline())['op'] == 'base'
+    assert strip(load_state('old.json')) == after_create
+
+# --- SQLite import ---
+
+@check
+async def check_sqlite_import():
+    import sqlite_storage
+    from bench import GUILD_ID, generate_league
+    from card_ledger import CsvCardLedger
+    from journal import load_state
+
+    generate_league('.', 'imp', players=4, weeks=3, games=2, cards=40)
+    json_path, csv_path = f'league_{GUILD_ID}_imp.json', f'cards_{GUILD_ID}_imp.csv'
+    # one removal, so the ledger and the weeks' card history differ
+    ledger = CsvCardLedger(csv_path)
+    ledger.remove(5)
+    rows = lambda ledger: sorted((r['week'], r['user_id'], r['card_name'], r['tcgplayer_id'], r['price'])
+                                 for r in ledger)
+    expected_rows = rows(ledger)
+    expected = {k: v for k, v in load_state(json_path).items() if k != 'journal_seq'}
+
+    storage = sqlite_storage.SqliteStorage('league.sqlite3')
+    try:
+        (path, lid, n_cards), = sqlite_storage.import_files('.', storage.conn)
+        assert lid is not None and n_cards == len(expected_rows)
+        lg = await storage.open(str(GUILD_ID), 'imp')
+        assert lg.data == expected
+        assert rows(lg.ledger) == expected_rows
+        assert lg.standings.check(lg.data, lg.ledger)[0] == []
+
+        # a second import skips the league unless asked to replace it
+        (_, again, _), = sqlite_storage.import_files('.', storage.conn)
+        assert again is None
+        (_, replaced, _), = sqlite_storage.import_files('.', storage.conn, replace=True)
+        assert replaced is not None
+        lg = await storage.open(str(GUILD_ID), 'imp')
+        assert lg.data == expected and rows(lg.ledger) == expected_rows
+    finally:
+        storage.close()
+
+# --- CSV card ledger ---
+
+def cards_csv(path: str, rows: list):
+    from card_ledger import CsvCardLedger
+    ledger = CsvCardLedger(path)
+    for week, uid, tcg, price in rows:
+        ledger.add(week, uid, f'Card {tcg}', tcg, price)
+    return ledger
+
+# Reads that verify the file while a writable ledger is live use
+# readonly=True, as audits do; a second writer would compact under it
+
+@check
+def check_csv_tombstones():
+    import shutil
+    from card_ledger import CsvCardLedger
+
+    live = lambda ledger: sorted((r['week'], r['user_id'], r['card_name'], r['price']) for r in ledger)
+    ledger = cards_csv('cards.csv', [('1', 'u', t, t / 10) for t in range(1, 6)])
+    ledger.compact_threshold = 3
+    ledger.remove(0)
+    ledger.remove(3)
+    assert os.path.exists('cards.csv.tombstones')
+    with open('cards.csv') as f:
+        assert len(f.readlines()) == 6, 'removal rewrote the CSV'
+    expected = live(ledger)
+
+    # reloading folds the tombstones in; a leftover sidecar from an
+    # interrupted compaction must not kill the rows now on those lines
+    shutil.copy('cards.csv.tombstones', 'stale.tombstones')
+    assert live(CsvCardLedger('cards.csv')) == expected
+    assert not os.path.exists('cards.csv.tombstones')
+    shutil.copy('stale.tombstones', 'cards.csv.tombstones')
+    ledger = CsvCardLedger('cards.csv')
+    assert live(ledger) == expected, 'stale tombstones removed live rows'
+
+    # appends after a compaction take fresh lines, so later tombstones hit the right row
+    row = ledger.add('2', 'u', 'Card 9', 9, 0.9)
+    ledger.remove(next(r['id'] for r in ledger if r['card_name'] == 'Card 2'))
+    expected = sorted(set(expected) - {('1', 'u', 'Card 2', '0.20')} | {('2', 'u', 'Card 9', '0.90')})
+    assert live(CsvCardLedger('cards.csv', readonly=True)) == expected
+    ledger.remove(row['id'])
+    assert live(CsvCardLedger('cards.csv', readonly=True)) == expected[:-1]
+
+    # past the threshold the sidecar is compacted away
+    ledger = CsvCardLedger('cards.csv', compact_threshold=2)
+    for eid in list(ledger.entries)[:2]:
+        ledger.remove(eid)
+    assert not os.path.exists('cards.csv.tombstones')
+    assert live(CsvCardLedger('cards.csv')) == live(ledger)
+
+    # readonly ledgers never touch the files
+    with open('cards.csv.tombstones', 'w') as f:
+        f.write('0,1,u,Card 1,1,0.10\n')
+    before = open('cards.csv').read()
+    CsvCardLedger('cards.csv', readonly=True)
+    assert open('cards.csv').read() == before and os.path.exists('cards.csv.tombstones')
+
+# --- Re-pricing ---
+
+@check
+async def check_revalue():
+    from bench import start_mock_scryfall, mock_price
+    from card_ledger import CsvCardLedger
+    from revalue import revalue
+    from scryfall import ScryfallClient, ScryfallError
+    from standings import Standings
+
+    # 200 distinct ids: three /cards/collection chunks
+    rows = [('1', str(i % 3), i, 0.01) for i in range(1, 201)]
+    ledger = cards_csv('cards.csv', rows)
+    data = {'players': ['0', '1', '2'], 'weeks': {'1': {'games': {}, 'finalized': False}}}
+    standings = Standings.build(data, ledger)
+
+    runner, url = await start_mock_scryfall(fail_from=150)
+    client = ScryfallClient(base_url=url, rate=1000, retries=0)
+    try:
+        # a failed chunk leaves ledger, standings and file untouched
+        try:
+            await revalue(ledger, client, lock=asyncio.Lock(), standings=standings)
+            raise AssertionError('expected ScryfallError')
+        except ScryfallError:
+            pass
+        assert all(r['price'] == '0.01' for r in ledger), 'prices applied after a failed chunk'
+        assert standings.check(data, ledger)[0] == []
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+    runner, url = await start_mock_scryfall()
+    client = ScryfallClient(base_url=url, rate=1000, retries=0)
+    try:
+        changes = await revalue(ledger, client, lock=asyncio.Lock(), standings=standings)
+    finally:
+        await client.close()
+        await runner.cleanup()
+    assert len(changes) == 200
+    expected = {str(i): mock_price(i) for i in range(1, 201)}
+    assert {r['tcgplayer_id']: r['price'] for r in ledger} == expected
+    assert standings.check(data, ledger)[0] == [], 'standings drifted from the repriced ledger'
+    reloaded = CsvCardLedger('cards.csv')
+    assert {r['tcgplayer_id']: r['price'] for r in reloaded} == expected, 'new prices not saved'
+    assert round(reloaded.usage('0')[1], 2) == round(ledger.usage('0')[1], 2)
+
+# --- Runner ---
+
+def run_check(name: str, fn) -> bool:
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            if asyncio.iscoroutinefunction(fn):
+                asyncio.run(fn())
+            else:
+                fn()
+            print(f'ok    {name}')
+            return True
+        except Exception:
+            print(f'FAIL  {name}')
+            traceback.print_exc()
+            return False
+        finally:
+            os.chdir(cwd)
+
+def main(argv) -> int:
+    names = argv or list(CHECKS)
+    unknown = [n for n in names if n not in CHECKS]
+    if unknown:
+        print(f"Unknown checks: {', '.join(unknown)} (have: {', '.join(CHECKS)})")
+        return 2
+    failed = [n for n in names if not run_check(n, CHECKS[n])]
+    print(f'{len(names) - len(failed)}/{len(names)} checks passed')
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,211 @@
+import asyncio, json, os, threading, time
+from persistence import WriteBehindStore
+from metrics import metrics, BYTES
+
+# League mutations as small events. apply_event is the single place that
+# turns an event into a change of the league dict, both live and on replay.
+#
+#   create          league_name, players
+#   base            state (full snapshot; seeds the journal of a pre-journal league)
+#   week_opened     week, num_games
+#   game_recorded   week, game, responses
+#   score_edited    week, game, user_id, placement, points
+#   card_added      week, user_id, card_name, tcgplayer_id, price
+#   card_removed    week, user_id, card_name, tcgplayer_id, price
+#   cards_repriced  count, old_total, new_total
+#   week_finalized  week, final_scores, allowances, card_additions
+
+def apply_event(data: dict, ev: dict):
+    op = ev['op']
+    if op == 'create':
+        data.clear()
+        data.update(league_name=ev['league_name'], players=list(ev['players']), weeks={})
+    elif op == 'base':
+        data.clear()
+        data.update(json.loads(json.dumps(ev['state'])))
+    elif op == 'week_opened':
+        data['weeks'][ev['week']] = {'games': {}, 'finalized': False, 'num_games': ev['num_games']}
+    elif op == 'game_recorded':
+        data['weeks'][ev['week']]['games'][ev['game']] = dict(ev['responses'])
+    elif op == 'score_edited':
+        data['weeks'][ev['week']]['games'][ev['game']][ev['user_id']] = {
+            'placement': ev['placement'], 'points': ev['points']}
+    elif op == 'card_added':
+        data['weeks'][ev['week']].setdefault('card_additions', {})\
+            .setdefault(ev['user_id'], [])\
+            .append(f"{ev['card_name']} (${ev['price']})")
+    elif op in ('card_removed', 'cards_repriced'):
+        pass  # the card ledger owns card rows; kept in the journal for the audit trail
+    elif op == 'week_finalized':
+        data['weeks'][ev['week']].update(
+            final_scores=ev['final_scores'],
+            allowances=ev['allowances'],
+            card_additions=ev['card_additions'],
+            finalized=True,
+        )
+    else:
+        raise ValueError(f'Unknown journal event {op!r}')
+
+def replay(events, upto_seq: int = None, state: dict = None) -> dict:
+    state = {} if state is None else state
+    for ev in events:
+        if upto_seq is not None and ev['seq'] > upto_seq:
+            break
+        apply_event(state, ev)
+    return state
+
+def read_events(path: str, after: int = 0) -> list:
+    events = []
+    if not os.path.exists(path):
+        return events
+    with open(path) as f:
+        for line in f:
+            try:
+                ev = json.loads(line)
+            except ValueError:
+                break  # torn final line from a crash mid-append
+            if ev['seq'] > after:
+                events.append(ev)
+    return events
+
+def _drop_torn_line(path: str):
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as f:
+        raw = f.read()
+        if raw and not raw.endswith(b'\n'):
+            f.truncate(raw.rfind(b'\n') + 1)
+
+# Append-only JSON-lines journal. Lines dropped by truncate() are moved to
+# <journal>.archive so the full history stays available for audits.
+
+class Journal:
+    def __init__(self, path: str, seq: int = 0):
+        self.path = path
+        self.archive_path = path + '.archive'
+        self._lock = threading.Lock()
+        _drop_torn_line(path)
+        tail = read_events(path)
+        self.seq = max([seq] + [ev['seq'] for ev in tail])
+        self._file = open(path, 'a')
+        self.size = self._file.tell()
+
+    # Timed as save_seconds/save_bytes kind=journal, beside the snapshots
+
+    def append(self, ev: dict) -> dict:
+        t0 = time.perf_counter()
+        with self._lock:
+            self.seq += 1
+            ev = {'seq': self.seq, 'ts': round(time.time(), 3), **ev}
+            line = json.dumps(ev, separators=(',', ':')) + '\n'
+            self._file.write(line)
+            self._file.flush()
+            self.size += len(line)
+        metrics.observe('save_seconds', time.perf_counter() - t0, kind='journal')
+        metrics.observe('save_bytes', len(line), buckets=BYTES, kind='journal')
+        return ev
+
+    def truncate(self, upto_seq: int):
+        with self._lock:
+            self._file.close()
+            with open(self.path) as f:
+                lines = f.readlines()
+            keep, drop = [], []
+            for line in lines:
+                try:
+                    seq = json.loads(line)['seq']
+                except ValueError:
+                    continue
+                (drop if seq <= upto_seq else keep).append(line)
+            with open(self.archive_path, 'a') as f:
+                f.writelines(drop)
+                f.flush()
+                os.fsync(f.fileno())
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w') as f:
+                f.writelines(keep)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._file = open(self.path, 'a')
+            self.size = self._file.tell()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+# League persistence as snapshot + journal tail. record() applies an event
+# and appends one journal line (O(change)); once the journal passes
+# compact_bytes a snapshot is written off-loop and the journal truncated.
+# The snapshot remembers the last event it contains in 'journal_seq'.
+
+class JournaledStore:
+    def __init__(self, path: str, state: dict, compact_bytes: int = 256 * 1024, delay: float = 2.0):
+        self.path = path
+        self.state = state
+        self.compact_bytes = compact_bytes
+        self.snapshots = WriteBehindStore(path, state, delay=delay)
+        self.journal = Journal(journal_path(path), state.get('journal_seq', 0))
+        self._compaction = None
+        if state and not os.path.exists(self.journal.archive_path) and self.journal.size == 0:
+            self.record({'op': 'base', 'state': {k: v for k, v in state.items() if k != 'journal_seq'}})
+
+    def record(self, ev: dict) -> dict:
+        apply_event(self.state, ev)
+        ev = self.journal.append(ev)
+        self.state['journal_seq'] = ev['seq']
+        if self.journal.size >= self.compact_bytes and self._compaction is None:
+            self._compaction = asyncio.get_running_loop().create_task(self.compact())
+        return ev
+
+    async def compact(self):
+        try:
+            seq = self.state.get('journal_seq', 0)
+            self.snapshots.mark_dirty()
+            await self.snapshots.flush()
+            if self.snapshots.dirty:
+                return  # snapshot failed; keep the journal so nothing is lost
+            await asyncio.to_thread(self.journal.truncate, seq)
+        finally:
+            self._compaction = None
+
+    async def flush(self):
+        if self._compaction is not None:
+            await self._compaction
+        await self.compact()
+
+    def close(self):
+        self.journal.close()
+
+def journal_path(data_path: str) -> str:
+    return os.path.splitext(data_path)[0] + '.journal'
+
+# Remove the journal and its archive, e.g. when a league file is recreated
+
+def discard_journal(data_path: str):
+    jp = journal_path(data_path)
+    for p in (jp, jp + '.archive'):
+        if os.path.exists(p):
+            os.remove(p)
+
+# Latest snapshot plus the journal tail after it
+
+def load_state(path: str) -> dict:
+    with open(path) as f:
+        state = json.load(f)
+    tail = read_events(journal_path(path), after=state.get('journal_seq', 0))
+    replay(tail, state=state)
+    if tail:
+        state['journal_seq'] = tail[-1]['seq']
+    return state
+
+# Rebuild the league as it stood after event upto_seq, from the full history
+
+def reconstruct(path: str, upto_seq: int = None) -> dict:
+    jp = journal_path(path)
+    events, last = [], 0
+    for ev in read_events(jp + '.archive') + read_events(jp):
+        if ev['seq'] > last:  # a crash mid-truncate can leave lines in both files
+            events.append(ev)
+            last = ev['seq']
+    return replay(events, upto_seq)
@@ -0,0 +1,55 @@
+import asyncio
+from cache import TTLCache
+from metrics import metrics
+
+# Resolves league players to display names without chunking whole guilds.
+# Names come from the TTL cache, then discord.py's member cache, then one
+# query-by-ids gateway request per 100 missing players. Players who can't
+# be found (left the server) render as "Unknown player" instead of crashing.
+
+QUERY_BATCH = 100
+
+class Player:
+    __slots__ = ('id', 'display_name')
+
+    def __init__(self, user_id: int, display_name: str):
+        self.id = user_id
+        self.display_name = display_name
+
+    @property
+    def mention(self) -> str:
+        return f'<@{self.id}>'
+
+class MemberResolver:
+    def __init__(self, ttl: float = 600, maxsize: int = 10000):
+        self.names = TTLCache('members', ttl=ttl, maxsize=maxsize)
+
+    def remember(self, member):
+        self.names.set(f'{member.guild.id}:{member.id}', member.display_name)
+
+    async def resolve(self, guild, user_ids) -> dict:
+        found, missing = {}, []
+        for uid in {int(u) for u in user_ids}:
+            name = self.names.get(f'{guild.id}:{uid}')
+            if name is None:
+                member = guild.get_member(uid)
+                if member is not None:
+                    self.remember(member)
+                    name = member.display_name
+            if name is None:
+                missing.append(uid)
+            else:
+                found[str(uid)] = Player(uid, name)
+        for i in range(0, len(missing), QUERY_BATCH):
+            try:
+                with metrics.timer('discord_gateway_seconds', op='query_members'):
+                    batch = await guild.query_members(user_ids=missing[i:i + QUERY_BATCH],
+                                                      limit=QUERY_BATCH, cache=False)
+            except asyncio.TimeoutError:
+                continue
+            for member in batch:
+                self.remember(member)
+                found[str(member.id)] = Player(member.id, member.display_name)
+        for uid in missing:
+            found.setdefault(str(uid), Player(uid, 'Unknown player'))
+        return found
@@ -0,0 +1,77 @@
+import asyncio, json, logging
+import discord
+from persistence import WriteBehindStore
+from metrics import metrics
+
+log = logging.getLogger(__name__)
+
+# Remembers the bot's last deletable message per channel so clean_send can
+# delete it by id instead of scanning channel history. Deletes are queued
+# and run by a background worker, which coalesces whatever piles up within
+# `window` seconds into one bulk delete per channel.
+# With a path, the channel -> message id map survives restarts.
+
+class MessageTracker:
+    def __init__(self, path: str = None, window: float = 0.5):
+        self.last = {}   # str(channel_id) -> message id
+        self.window = window
+        self.queue = asyncio.Queue()
+        self.store = None
+        if path:
+            self.store = WriteBehindStore(path, self.last, delay=5.0)
+            try:
+                with open(path) as f:
+                    self.last.update(json.load(f))
+            except FileNotFoundError:
+                pass
+
+    def track(self, message, deletable: bool):
+        if deletable:
+            self.last[str(message.channel.id)] = message.id
+            if self.store is not None:
+                self.store.mark_dirty()
+
+    # Queue the tracked message in channel for deletion, if there is one
+
+    def discard(self, channel):
+        mid = self.last.pop(str(channel.id), None)
+        if mid is None:
+            return
+        if self.store is not None:
+            self.store.mark_dirty()
+        self.queue.put_nowait((channel, mid))
+
+    async def run(self):
+        while True:
+            batch = [await self.queue.get()]
+            await asyncio.sleep(self.window)
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            by_channel = {}
+            for channel, mid in batch:
+                by_channel.setdefault(channel.id, (channel, []))[1].append(mid)
+            for channel, mids in by_channel.values():
+                await self._delete(channel, mids)
+
+    async def _delete(self, channel, mids):
+        if len(mids) > 1 and hasattr(channel, 'delete_messages'):
+            try:
+                with metrics.timer('discord_rest_seconds', op='bulk_delete'):
+                    await channel.delete_messages([discord.Object(id=m) for m in mids])
+                return
+            except discord.HTTPException:
+                # no Manage Messages, or too old for bulk delete
+                metrics.inc('discord_rest_errors', op='bulk_delete')
+        for mid in mids:
+            try:
+                with metrics.timer('discord_rest_seconds', op='delete'):
+                    await channel.get_partial_message(mid).delete()
+            except discord.NotFound:
+                pass
+            except discord.HTTPException as e:
+                metrics.inc('discord_rest_errors', op='delete')
+                log.warning('Deleting message %s failed: %r', mid, e)
+
+    async def flush(self):
+        if self.store is not None:
+            await self.store.flush()
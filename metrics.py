@@ -0,0 +1,109 @@
+import asyncio, logging, time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+# In-process metrics: counters and histograms keyed by name + labels.
+# Histograms keep Prometheus-style cumulative buckets plus the most recent
+# samples for percentiles in !botstats. Recording is a dict lookup and a
+# few additions, cheap enough to wrap every command and REST call.
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES = (1 << 10, 1 << 14, 1 << 17, 1 << 20, 1 << 23, 1 << 26)
+
+class Histogram:
+    def __init__(self, buckets=SECONDS, recent: int = 512):
+        self.bounds = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=recent)
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def quantile(self, q: float) -> float:
+        if not self.recent:
+            return 0.0
+        vals = sorted(self.recent)
+        return vals[min(len(vals) - 1, int(q * len(vals)))]
+
+class Metrics:
+    def __init__(self):
+        self.counters = {}     # (name, labels) -> value
+        self.histograms = {}   # (name, labels) -> Histogram
+
+    def inc(self, name: str, n: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    def observe(self, name: str, value: float, buckets=SECONDS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        h = self.histograms.get(key)
+        if h is None:
+            h = self.histograms[key] = Histogram(buckets)
+        h.observe(value)
+
+    # Time a block in seconds, whether or not it raises
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def series(self, name: str):
+        return [(dict(labels), h) for (n, labels), h in list(self.histograms.items()) if n == name]
+
+    # --- Prometheus text format ---
+
+    def prometheus(self) -> str:
+        def fmt(labels, extra=()):
+            items = list(labels) + list(extra)
+            if not items:
+                return ''
+            return '{' + ','.join(f'{k}="{v}"' for k, v in items) + '}'
+
+        # copies: snapshot saves record from worker threads
+        counters, histograms = list(self.counters.items()), list(self.histograms.items())
+        lines = []
+        for name in sorted({n for (n, _), _ in counters}):
+            lines.append(f'# TYPE mtg_{name}_total counter')
+            for (n, labels), v in counters:
+                if n == name:
+                    lines.append(f'mtg_{name}_total{fmt(labels)} {v}')
+        for name in sorted({n for (n, _), _ in histograms}):
+            lines.append(f'# TYPE mtg_{name} histogram')
+            for (n, labels), h in histograms:
+                if n != name:
+                    continue
+                cum = 0
+                for bound, c in zip(list(h.bounds) + ['+Inf'], h.counts):
+                    cum += c
+                    lines.append(f'mtg_{name}_bucket{fmt(labels, [("le", bound)])} {cum}')
+                lines.append(f'mtg_{name}_sum{fmt(labels)} {h.sum}')
+                lines.append(f'mtg_{name}_count{fmt(labels)} {h.count}')
+        return '\n'.join(lines) + '\n'
+
+    # Rewrite path every interval seconds, for node_exporter's textfile collector
+
+    async def export_forever(self, path: str, interval: float = 15):
+        from persistence import atomic_write
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                text = self.prometheus()
+                await asyncio.to_thread(atomic_write, path, text)
+            except OSError as e:
+                log.warning('Writing metrics to %s failed: %r', path, e)
+
+metrics = Metrics()
@@ -1,147 +1,304 @@
 import discord
 from discord.ext import commands
-import json, os, csv, aiohttp, urllib.parse, shlex, re
+from discord import app_commands
+import asyncio, logging, os, shlex, re, time, typing
+from contextlib import asynccontextmanager
+from cache import CacheStore, TTLCache
+from scryfall import ScryfallClient, ScryfallError
+from card_index import CardIndex
+from name_index import NameIndex
+from card_ledger import CARD_FIELDS
+from storage import league_slug, storage_from_env
+from registry import LeagueRegistry
+from message_tracker import MessageTracker
+from score_sessions import ScoreSessions
+from chat_sessions import ChatSessions, SessionEnded
+from members import MemberResolver
+from paginator import Paginator, clip_lines, FIELD_LIMIT, DESCRIPTION_LIMIT
+from metrics import metrics
+from revalue import revalue, summarize
+import scoring
+try:
+    import analytics
+except ImportError:  # numpy not installed; !stats is disabled
+    analytics = None
+
+log = logging.getLogger(__name__)
 
 # Embed style and bot metadata
 EMBED_COLOR = discord.Color.blurple()
 BOT_NAME = "MTG League Bot"
 
-# Globals for current league
-# data_file: path to JSON storing league state
-# card_csv: path to CSV storing card additions
-# data: in-memory league data
-# pending_scores: tracks active scoring messages
+# Globals
+# registry: leagues per guild (or channel), loaded lazily and evicted when idle
+# pending_scores: tracks active scoring messages, persisted across restarts
 
-data_file = None
-card_csv = None
-data = {}
-pending_scores = {}
+pending_scores = ScoreSessions(os.getenv('PENDING_SCORES_FILE', 'pending_scores.json'))
 
 token = os.getenv('DISCORD_TOKEN')
+save_delay = float(os.getenv('SAVE_DELAY', '2.0'))
+journal_compact_bytes = int(os.getenv('JOURNAL_COMPACT_BYTES', str(256 * 1024)))
+storage = storage_from_env(compact_bytes=journal_compact_bytes, delay=save_delay)
+registry = LeagueRegistry(storage,
+                          max_loaded=int(os.getenv('LEAGUE_CACHE_SIZE', '32')),
+                          idle_seconds=float(os.getenv('LEAGUE_IDLE_SECONDS', '1800')),
+                          per_channel=os.getenv('LEAGUE_PER_CHANNEL') == '1')
 intents = discord.Intents.default()
 intents.members = True
 intents.message_content = True
-bot = commands.Bot(command_prefix='!', intents=intents)
+
+# Guild member lists are not chunked at startup; league players are looked
+# up on demand and their display names cached for all embeds
+members = MemberResolver(ttl=float(os.getenv('MEMBER_NAME_TTL', '600')))
+
+# Season analytics per set of leagues, recomputed when their results change
+season_stats = TTLCache('stats', ttl=3600, maxsize=64)
+
+# Scryfall response caches: search results change rarely, prices daily-ish
+cache_store = CacheStore(os.getenv('SCRYFALL_CACHE', 'scryfall_cache.sqlite3'))
+search_cache = TTLCache('search', ttl=24 * 3600, maxsize=512, store=cache_store)
+price_cache = TTLCache('price', ttl=3600, maxsize=2048, store=cache_store)
+
+# Bot's last deletable message per channel (MESSAGE_TRACKER_FILE persists it)
+tracker = MessageTracker(os.getenv('MESSAGE_TRACKER_FILE'))
+
+# Chat prompts of !addcard / !removecard: one per user and channel, each
+# reply waited for at most PROMPT_TIMEOUT seconds, at most MAX_PROMPTS open
+prompts = ChatSessions(max_sessions=int(os.getenv('MAX_PROMPTS', '200')),
+                       timeout=float(os.getenv('PROMPT_TIMEOUT', '120')))
+
+# Shared Scryfall client; its session is opened in setup_hook and closed on shutdown
+scryfall = ScryfallClient(search_cache=search_cache, price_cache=price_cache)
+
+# Optional offline index over Scryfall bulk data (SCRYFALL_BULK_INDEX=path/to/index.sqlite3).
+# SCRYFALL_BULK_FILE builds it from a local default_cards file instead of downloading.
+card_index = None
+if os.getenv('SCRYFALL_BULK_INDEX'):
+    card_index = CardIndex(os.getenv('SCRYFALL_BULK_INDEX'), os.getenv('SCRYFALL_BULK_FILE'))
+
+# Card-name prefix index for /addcard autocomplete (CARD_NAMES_FILE caches the catalog)
+name_index = NameIndex(os.getenv('CARD_NAMES_FILE', 'card_names.json'))
+
+class LeagueBot(commands.Bot):
+    async def setup_hook(self):
+        await scryfall.open()
+        if card_index is not None:
+            self.card_index_task = asyncio.create_task(card_index.refresh_forever(scryfall))
+        self.name_index_task = asyncio.create_task(name_index.refresh_forever(scryfall, card_index))
+        self.league_sweep_task = asyncio.create_task(registry.sweep_forever())
+        self.delete_task = asyncio.create_task(tracker.run())
+        # SYNC_COMMANDS=0 skips publishing slash commands on startup
+        if os.getenv('SYNC_COMMANDS', '1') == '1':
+            await self.tree.sync()
+        # METRICS_FILE: Prometheus text file, rewritten every METRICS_INTERVAL seconds
+        if os.getenv('METRICS_FILE'):
+            self.metrics_task = asyncio.create_task(metrics.export_forever(
+                os.getenv('METRICS_FILE'), float(os.getenv('METRICS_INTERVAL', '15'))))
+
+    async def close(self):
+        await registry.close()
+        await tracker.flush()
+        await pending_scores.flush()
+        storage.close()
+        await scryfall.close()
+        await super().close()
+
+# Scoring runs on raw gateway events, so only a small message cache is needed
+bot = LeagueBot(command_prefix='!', intents=intents,
+                max_messages=int(os.getenv('MESSAGE_CACHE_SIZE', '100')),
+                chunk_guilds_at_startup=False)
 
 # --- Helper functions ---
 
-def save_data():
-    with open(data_file, 'w') as f:
-        json.dump(data, f, indent=2)
+# Attach the channel's active league to every league command as ctx.league,
+# pinned for the duration of the command so it can't be evicted mid-flow.
+# Mutations go through lg.record() while holding lg.lock.
+
+LEAGUELESS_COMMANDS = {'commands', 'createleague', 'loadleague', 'botstats'}
+
+@bot.before_invoke
+async def attach_league(ctx):
+    ctx.started = time.perf_counter()
+    ctx.league = None
+    if ctx.guild is not None and ctx.command.name not in LEAGUELESS_COMMANDS:
+        ctx.league = await registry.get(ctx.guild.id, ctx.channel.id)
+        if ctx.league is not None:
+            registry.pin(ctx.league)
+
+@bot.after_invoke
+async def release_league(ctx):
+    if getattr(ctx, 'league', None) is not None:
+        registry.unpin(ctx.league)
+    if hasattr(ctx, 'started'):
+        metrics.observe('command_seconds', time.perf_counter() - ctx.started, command=ctx.command.name)
+        if ctx.command_failed:
+            metrics.inc('command_errors', command=ctx.command.name)
 
 # Build a consistent embed with author, timestamp, footer
 
-def make_embed(title: str = None, description: str = '') -> discord.Embed:
+def make_embed(title: str = None, description: str = '', lg=None) -> discord.Embed:
     embed = discord.Embed(title=title, description=description,
                           color=EMBED_COLOR,
                           timestamp=discord.utils.utcnow())
     embed.set_author(name=BOT_NAME)
-    embed.set_footer(text=f"League: {data.get('league_name', 'n/a')}")
+    embed.set_footer(text=f"League: {lg.data.get('league_name', 'n/a') if lg else 'n/a'}")
     return embed
 
 # Remove old bot messages (but keep week summaries and leaderboards)
 
 enabled_delete = lambda t: not (t and (t.startswith('Week ') or 'Finalized' in t or 'Leaderboard' in t))
 
+# Send an embed and remember it for deletion if its title allows
+
+async def send_embed(channel, embed, view=None):
+    with metrics.timer('discord_rest_seconds', op='send'):
+        if view is None:
+            msg = await channel.send(embed=embed)
+        else:
+            msg = await channel.send(embed=embed, view=view)
+            view.message = msg
+    tracker.track(msg, enabled_delete(embed.title))
+    return msg
+
+# Send the first page of a paginated view; later pages render on click
+
+async def send_pages(ctx, count, render, version, clean=True):
+    if clean:
+        tracker.discard(ctx.channel)
+    pager = Paginator(count, render, version, ctx.author.id)
+    embed, view = await pager.first()
+    return await send_embed(ctx.channel, embed, view)
+
+# The previous deletable message is deleted by id in the background
+
 async def clean_send(channel, *, title=None, description=''):
-    async for msg in channel.history(limit=20):
-        if msg.author == bot.user and msg.embeds:
-            emb = msg.embeds[0]
-            t = emb.title if emb.title else None
-            if enabled_delete(t):
-                await msg.delete()
-                break
-    embed = make_embed(title, description)
-    return await channel.send(embed=embed)
+    tracker.discard(channel)
+    lg = registry.peek(channel.guild.id, channel.id) if channel.guild else None
+    embed = make_embed(title, description, lg)
+    return await send_embed(channel, embed)
+
+# Chat prompt for ctx.author in ctx.channel, or None (after saying so) when
+# too many are open. A timeout or "cancel" ends the flow with a note; a
+# newer prompt from the same user replaces this one silently.
+
+@asynccontextmanager
+async def prompt_session(ctx):
+    chat = prompts.open(ctx.channel.id, ctx.author.id)
+    if chat is None:
+        await clean_send(ctx.channel, title='Busy',
+                         description='Too many prompts are open; try again shortly.')
+        yield None
+        return
+    try:
+        yield chat
+    except SessionEnded as e:
+        if e.reason == 'timeout':
+            await clean_send(ctx.channel, title='Timed Out',
+                             description='No reply; run the command again.')
+        elif e.reason == 'cancelled':
+            await clean_send(ctx.channel, title='Cancelled', description='Nothing was changed.')
+    finally:
+        prompts.close(chat)
+
+@bot.listen('on_message')
+async def route_prompt_reply(message):
+    prompts.dispatch(message)
 
 # Auto-finalize a week: compute scores, allowances, and post summary
 
-async def finalize_week_procedures(channel, week: str):
-    wk_data = data['weeks'][week]
+async def finalize_week_procedures(lg, channel, week: str):
+    async with lg.lock:
+        data = lg.data
+        wk_data = data['weeks'][week]
+        if wk_data.get('finalized'):
+            return
 
-    # 1) final_scores
-    final_scores = {}
-    for game in wk_data['games'].values():
-        for pid, rec in game.items():
-            final_scores[pid] = final_scores.get(pid, 0) + rec['points']
-    wk_data['final_scores'] = final_scores
+        # scores, allowances and the week's cards, then mark finalized and save
+        ev = scoring.finalize_week(data, week, lg.ledger)
+        lg.record(ev)
+        final_scores, allowances, cards = ev['final_scores'], ev['allowances'], ev['card_additions']
+        # games still waiting for votes (an early !finalizeweek) are closed
+        pending_scores.close_week(lg.guild_id, lg.slug, week)
 
-    # 2) allowances based on average placement
-    num_games = wk_data.get('num_games', len(wk_data['games']))
-    players = data['players']
-    caps = {'win': (1, 5), 'middle': (3, 10), 'last': (5, 15)}
-    allowances = {}
-    for pid in players:
-        pid_str = str(pid)
-        total_place = sum(g[pid_str]['placement'] for g in wk_data['games'].values())
-        avg_place = total_place / num_games
-        if avg_place == 1:
-            cat = 'win'
-        elif avg_place == len(players):
-            cat = 'last'
-        else:
-            cat = 'middle'
-        card_lim, price_lim = caps[cat]
-        allowances[pid_str] = {
-            'category': cat,
-            'card_limit': card_lim,
-            'price_limit': price_lim
-        }
-    wk_data['allowances'] = allowances
-
-    # 3) collect card additions for the week
-    cards = {}
-    if os.path.exists(card_csv):
-        with open(card_csv) as f:
-            for row in csv.DictReader(f):
-                if row['week'] == week:
-                    cards.setdefault(row['user_id'], []).append(
-                        f"{row['card_name']} (${row['price']})"
-                    )
-    wk_data['card_additions'] = cards
-
-    # 4) mark finalized and save
-    wk_data['finalized'] = True
-    save_data()
-
-    # 5) post summary embed
-    embed = make_embed(f"Week {week} Finalized")
+    # post summary embed
+    names = await members.resolve(channel.guild, set(data['players']) | set(cards))
+    embed = make_embed(f"Week {week} Finalized", lg=lg)
     # Final Scores
     score_lines = "\n".join(
-        f"🏅 {channel.guild.get_member(int(pid)).display_name}: **{pts} pts**"
+        f"🏅 {names[pid].display_name}: **{pts} pts**"
         for pid, pts in sorted(final_scores.items(), key=lambda x: -x[1])
     ) or "No scores."
     embed.add_field(name="Final Scores", value=score_lines, inline=False)
 
     # Allowances
     allow_lines = "\n".join(
-        f"💳 {channel.guild.get_member(int(pid)).display_name}: {info['category'].title()} — {info['card_limit']} cards / ${info['price_limit']}"
+        f"💳 {names[pid].display_name}: {info['category'].title()} — {info['card_limit']} cards / ${info['price_limit']}"
         for pid, info in allowances.items()
     ) or "No allowances."
     embed.add_field(name="Allowances", value=allow_lines, inline=False)
 
     # Card additions
     card_lines = "\n".join(
-        f"📦 {channel.guild.get_member(int(uid)).display_name}: {', '.join(lst)}"
+        f"📦 {names[uid].display_name}: {', '.join(lst)}"
         for uid, lst in cards.items()
     ) or "No cards added."
     embed.add_field(name="Cards Added", value=card_lines, inline=False)
 
-    await channel.send(embed=embed)
+    await send_embed(channel, embed)
+
+# --- Card lookups: local bulk index first, Scryfall API as fallback ---
+
+async def find_cards(term: str) -> dict:
+    if card_index is not None:
+        res = card_index.search(term)
+        if res and res['data']:
+            return res
+    return await scryfall.search(term)
+
+async def card_details(tcg: int) -> dict:
+    if card_index is not None:
+        det = card_index.get_tcg(tcg)
+        if det is not None:
+            return det
+    return await scryfall.get_tcg(tcg)
+
+async def card_by_name(name: str) -> dict:
+    if card_index is not None:
+        det = card_index.named(name)
+        if det is not None:
+            return det
+    return await scryfall.named(name)
+
+def card_price(det: dict) -> float:
+    price_str = det.get('prices', {}).get('usd')
+    return float(price_str) if price_str else 0.0
+
+# --- Card allowance ---
+
+# Season allowance across all finalized weeks, and season usage:
+# (cards allowed, price allowed, cards used, spend)
+
+def card_allowance(lg, pid: str):
+    allowed_cards, allowed_price = lg.standings.allowed.get(pid, (0, 0.0))
+    used_cards, used_price = lg.ledger.usage(pid)
+    return allowed_cards, allowed_price, used_cards, used_price
 
-# --- Scryfall API helpers ---
+def allowance_text(lg, pid: str) -> str:
+    allowed_cards, allowed_price, used_cards, used_price = card_allowance(lg, pid)
+    return (f"You have used **{used_cards}/{allowed_cards}** cards "
+            f"and **${used_price:.2f}/${allowed_price:.2f}** this season.")
 
-async def scryfall_search(query: str):
-    url = f'https://api.scryfall.com/cards/search?format=json&q={urllib.parse.quote(query)}'
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as resp:
-            return await resp.json()
+# Add the card if it fits the season allowance. Usage is re-read under the
+# lock, in case of concurrent adds. Returns the ledger row, or None.
 
-async def scryfall_get_tcg(card_id: int):
-    url = f'https://api.scryfall.com/cards/tcgplayer/{card_id}'
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as resp:
-            return await resp.json()
+async def commit_card(lg, pid: str, week: str, name: str, tcg, price: float):
+    async with lg.lock:
+        allowed_cards, allowed_price, used_cards, used_price = card_allowance(lg, pid)
+        if used_cards + 1 > allowed_cards or used_price + price > allowed_price:
+            return None
+        row = lg.ledger.add(week, pid, name, tcg, price)
+        lg.record({'op': 'card_added', **{k: row[k] for k in CARD_FIELDS}})
+        return row
 
 # --- Bot commands ---
 
@@ -150,13 +307,17 @@ async def list_commands(ctx):
     cmds = [
         '!createleague "League Name" @p1 @p2 ...',
         '!loadleague "League Name"',
-        '!addscores [num_games]',
+        '!addscores [num_games] [reactions|buttons]',
         '!viewleague',
+        '!stats [@user] ["Other League" ...]',
         '!editscores <week> <game> <@user> <placement>',
-        '!addcard',
+        '!addcard  (or /addcard with autocomplete)',
         '!removecard',
         '!viewcards <@user>',
         '!finalizeweek',
+        '!revalue [preview]',
+        '!checkstandings',
+        '!botstats',
         '!commands'
     ]
     await clean_send(ctx.channel, title='Available Commands',
@@ -171,37 +332,33 @@ async def create_league(ctx, *, args: str):
                                  description='Usage: !createleague "League Name" @p1 @p2 ...')
     league_name = tokens[0]
     mentions = tokens[1:]
-    members = []
+    # mentioned members arrive with the message, so no member lookup is needed
+    mentioned = {m.id: m for m in ctx.message.mentions if isinstance(m, discord.Member)}
+    players = []
     for m in mentions:
         match = re.match(r'<@!?(\d+)>', m)
         if match:
-            member = ctx.guild.get_member(int(match.group(1)))
+            member = mentioned.get(int(match.group(1)))
             if member:
-                members.append(member)
-    if not members:
+                players.append(member)
+    if not players:
         return await clean_send(ctx.channel,
                                  title='Error',
                                  description='No valid members mentioned.')
 
-    guild_id = str(ctx.guild.id)
-    safe = re.sub(r'[^A-Za-z0-9_-]', '_', league_name)
-    global data_file, card_csv, data
-    data_file = f'league_{guild_id}_{safe}.json'
-    card_csv = f'cards_{guild_id}_{safe}.csv'
-    data = {
-        'league_name': league_name,
-        'players': [m.id for m in members],
-        'weeks': {}
-    }
-    with open(data_file, 'w') as f:
-        json.dump(data, f, indent=2)
-    if not os.path.exists(card_csv):
-        with open(card_csv, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(['week','user_id','card_name','tcgplayer_id','price'])
+    guild_id, slug = str(ctx.guild.id), league_slug(league_name)
+    # a league with games being scored or commands in flight is not replaced
+    scoring_open = any(str(info['guild']) == guild_id and info['slug'] == slug
+                       for _, info in pending_scores.items())
+    lg = None if scoring_open else await registry.create(guild_id, slug, league_name,
+                                                         [m.id for m in players], ctx.channel.id)
+    if lg is None:
+        return await clean_send(ctx.channel,
+                                 title='Error',
+                                 description=f'League "{league_name}" is in use; try again shortly.')
 
     desc = f"**League:** {league_name}\n" + \
-           f"**Players:** {' ,'.join(m.mention for m in members)}"
+           f"**Players:** {' ,'.join(m.mention for m in players)}"
     await clean_send(ctx.channel, title='League Created', description=desc)
 
 @bot.command(name='loadleague')
@@ -213,152 +370,332 @@ async def load_league(ctx, *, args: str):
                                  description='Usage: !loadleague "League Name"')
     league_name = tokens[0]
     guild_id = str(ctx.guild.id)
-    safe = re.sub(r'[^A-Za-z0-9_-]', '_', league_name)
-    df = f'league_{guild_id}_{safe}.json'
-    cc = f'cards_{guild_id}_{safe}.csv'
-    if not os.path.exists(df):
+    slug = league_slug(league_name)
+    if not storage.exists(guild_id, slug):
         return await clean_send(ctx.channel,
                                  title='Error',
                                  description=f'League "{league_name}" not found.')
-    global data_file, card_csv, data
-    data_file = df
-    card_csv = cc
-    with open(data_file) as f:
-        data = json.load(f)
-    await clean_send(ctx.channel, title='League Loaded', description=f"Loaded **{data['league_name']}**")
+    await registry.activate(guild_id, slug, ctx.channel.id)
+    lg = await registry.open(guild_id, slug)
+    await clean_send(ctx.channel, title='League Loaded', description=f"Loaded **{lg.data['league_name']}**")
+
+# Scoring prompts: 'reactions' mode posts every game message at once and
+# seeds the number reactions in the background (discord.py queues the
+# calls within each route's rate limit); 'buttons' mode attaches a
+# placement select menu instead, which needs no reaction round trips.
+
+score_mode = os.getenv('SCORE_MODE', 'reactions')
+background_tasks = set()
+
+def spawn(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+# custom_id makes the view persistent: reconcile_scores re-attaches it after a restart
+
+class PlacementView(discord.ui.View):
+    def __init__(self, num_players: int):
+        super().__init__(timeout=None)
+        select = discord.ui.Select(
+            custom_id=f'placement:{num_players}',
+            placeholder='Select your placement',
+            options=[discord.SelectOption(label=f'Place {i}', value=str(i))
+                     for i in range(1, num_players + 1)]
+        )
+        select.callback = self.on_select
+        self.add_item(select)
+
+    async def on_select(self, interaction: discord.Interaction):
+        mid = interaction.message.id
+        info = pending_scores.get(mid)
+        if info is None:
+            return await interaction.response.send_message('This game is closed.', ephemeral=True)
+        if str(interaction.user.id) not in info['players']:
+            return await interaction.response.send_message('You are not in this game.', ephemeral=True)
+        place = int(interaction.data['values'][0])
+        await interaction.response.send_message(f'Recorded place {place}.', ephemeral=True)
+        await handle_placement(interaction.channel, interaction.user.id, mid, place)
+
+async def seed_reactions(messages, places):
+    async def seed(msg):
+        for i in places:
+            with metrics.timer('discord_rest_seconds', op='react'):
+                await msg.add_reaction(f"{i}⃣")
+    await asyncio.gather(*(seed(m) for m in messages), return_exceptions=True)
 
 @bot.command(name='addscores')
-async def add_scores(ctx, num_games: int = 1):
-    if data_file is None:
+async def add_scores(ctx, num_games: int = 1, mode: str = None):
+    lg = ctx.league
+    if lg is None:
         return await clean_send(ctx.channel,
                                  title='Error',
                                  description='No league loaded.')
+    mode = mode or score_mode
+    if mode not in ('reactions', 'buttons'):
+        return await clean_send(ctx.channel,
+                                 title='Error',
+                                 description='Mode must be "reactions" or "buttons".')
+    data = lg.data
     # find or create current week
-    current = next((w for w,wk in data['weeks'].items() if not wk.get('finalized')), None)
-    if current is None:
-        current = str(len(data['weeks']) + 1)
-        data['weeks'][current] = {
-            'games': {},
-            'finalized': False,
-            'num_games': num_games
-        }
-        save_data()
+    async with lg.lock:
+        current = next((w for w,wk in data['weeks'].items() if not wk.get('finalized')), None)
+        if current is None:
+            current = str(len(data['weeks']) + 1)
+            lg.record({'op': 'week_opened', 'week': current, 'num_games': num_games})
     players = data['players']
-    for g in range(1, num_games+1):
-        choices = "\n".join(
-            f":{i}: {ctx.guild.get_member(pid).mention}"
-            for i,pid in enumerate(players,1)
-        )
+    prompt = "Select your placement below" if mode == 'buttons' else "React with placement"
+    choices = "\n".join(
+        f":{i}: <@{pid}>"
+        for i,pid in enumerate(players,1)
+    )
+
+    async def post(g):
         embed = make_embed(f"Week {current} - Game {g}",
-                           f"React with placement:\n{choices}")
-        msg = await ctx.send(embed=embed)
-        for i in range(1, len(players)+1):
-            await msg.add_reaction(f"{i}⃣")
-        pending_scores[msg.id] = {
+                           f"{prompt}:\n{choices}", lg)
+        with metrics.timer('discord_rest_seconds', op='send'):
+            if mode == 'buttons':
+                msg = await ctx.channel.send(embed=embed, view=PlacementView(len(players)))
+            else:
+                msg = await ctx.channel.send(embed=embed)
+        pending_scores.open(msg.id, {
+            'guild': lg.guild_id,
+            'slug': lg.slug,
+            'channel': ctx.channel.id,
+            'mode': mode,
             'week': current,
             'game': str(g),
-            'players': set(str(pid) for pid in players),
+            'players': [str(pid) for pid in players],
             'responses': {}
-        }
+        })
+        return msg
+
+    messages = await asyncio.gather(*(post(g) for g in range(1, num_games+1)))
+    if mode == 'reactions':
+        spawn(seed_reactions(messages, range(1, len(players)+1)))
+
+# Raw events fire whether or not the scoring message is still in the message cache
+
+def reaction_place(emoji):
+    name = emoji if isinstance(emoji, str) else emoji.name
+    try:
+        return int(name[0])
+    except (TypeError, ValueError, IndexError):
+        return None
 
 @bot.event
-async def on_reaction_add(reaction, user):
-    if user.bot or data_file is None:
+async def on_raw_reaction_add(payload):
+    if payload.user_id == bot.user.id or payload.message_id not in pending_scores:
         return
-    mid = reaction.message.id
-    if mid not in pending_scores:
+    place = reaction_place(payload.emoji)
+    if place is None:
         return
-    info = pending_scores[mid]
-    week, game = info['week'], info['game']
-    if data['weeks'][week]['finalized']:
+    channel = bot.get_channel(payload.channel_id)
+    if channel is not None:
+        await handle_placement(channel, payload.user_id, payload.message_id, place)
+
+async def handle_placement(channel, user_id: int, mid, place: int):
+    info = pending_scores.get(mid)
+    if info is None or str(user_id) not in info['players']:
         return
+    lg = await registry.open(info['guild'], info['slug'])
+    registry.pin(lg)
     try:
-        place = int(reaction.emoji[0])
-    except:
-        return
-    pid = str(user.id)
+        await record_placement(lg, channel, str(user_id), mid, info, place)
+    finally:
+        registry.unpin(lg)
+
+async def record_placement(lg, channel, pid: str, mid, info, place: int):
+    data = lg.data
+    week, game = info['week'], info['game']
     total = len(info['players'])
-    points = 3 if place == 1 else (0 if place == total else 1)
-    info['responses'][pid] = {'placement': place, 'points': points}
+    points = scoring.points_for(place, total)
+    async with lg.lock:
+        if mid not in pending_scores:
+            return
+        if data['weeks'][week]['finalized']:
+            pending_scores.close(mid)
+            return
+        info['responses'][pid] = {'placement': place, 'points': points}
+        pending_scores.touch()
+        complete = set(info['players']) == set(info['responses'].keys())
+        if complete:
+            # all have reacted
+            lg.record({'op': 'game_recorded', 'week': week, 'game': game, 'responses': info['responses']})
+            pending_scores.close(mid)
 
-    if info['players'] == set(info['responses'].keys()):
-        # all have reacted
-        data['weeks'][week]['games'][game] = info['responses']
-        save_data()
+    if complete:
         # show results embed
+        names = await members.resolve(channel.guild, info['players'])
         lines = "\n".join(
-            f"{reaction.message.guild.get_member(int(p)).display_name}: place {r['placement']} — **{r['points']} pts**"
+            f"{names[p].display_name}: place {r['placement']} — **{r['points']} pts**"
             for p,r in sorted(info['responses'].items(), key=lambda x: x[1]['placement'])
         )
-        await clean_send(reaction.message.channel,
+        await clean_send(channel,
                          title=f"Results W{week} G{game}",
                          description=lines)
-        del pending_scores[mid]
         # if this was the last game, finalize week
         wk = data['weeks'][week]
         if not wk.get('finalized') and len(wk['games']) == wk.get('num_games', 0):
-            await finalize_week_procedures(reaction.message.channel, week)
+            await finalize_week_procedures(lg, channel, week)
+
+# After a restart, catch up on votes cast while the bot was down: re-read
+# the reactions on every open reaction session and re-attach select menus
+
+reconciled = False
+
+@bot.event
+async def on_ready():
+    global reconciled
+    if not reconciled:
+        reconciled = True
+        await reconcile_scores()
+
+async def scoring_week_open(info) -> bool:
+    if not storage.exists(info['guild'], info['slug']):
+        return False
+    wk = (await registry.open(info['guild'], info['slug'])).data['weeks'].get(info['week'])
+    return wk is not None and not wk.get('finalized')
+
+async def reconcile_scores():
+    for mid, info in pending_scores.items():
+        # sessions whose week was finalized (or league replaced) meanwhile
+        if not await scoring_week_open(info):
+            pending_scores.close(mid)
+            continue
+        if info['mode'] == 'buttons':
+            bot.add_view(PlacementView(len(info['players'])), message_id=int(mid))
+            continue
+        try:
+            channel = bot.get_channel(info['channel']) or await bot.fetch_channel(info['channel'])
+            with metrics.timer('discord_rest_seconds', op='fetch'):
+                msg = await channel.fetch_message(int(mid))
+        except discord.NotFound:
+            pending_scores.close(mid)
+            continue
+        except discord.HTTPException as e:
+            log.warning('Reconciling scoring message %s failed: %r', mid, e)
+            continue
+        for reaction in msg.reactions:
+            place = reaction_place(reaction.emoji)
+            if place is None:
+                continue
+            async for user in reaction.users():
+                if not user.bot and str(user.id) not in info['responses']:
+                    await handle_placement(channel, user.id, mid, place)
+        # finish seeding that a restart interrupted, if the game is still open
+        seeded = {reaction_place(r.emoji) for r in msg.reactions if r.me}
+        missing = [i for i in range(1, len(info['players'])+1) if i not in seeded]
+        if missing and mid in pending_scores:
+            spawn(seed_reactions([msg], missing))
+
+# Ratings and placement stats for the active league, optionally combined
+# with earlier seasons named by league. With a member: their record
+# against each opponent.
+
+@bot.command(name='stats')
+async def stats(ctx, member: typing.Optional[discord.Member] = None, *others: str):
+    lg = ctx.league
+    if lg is None:
+        return await clean_send(ctx.channel,
+                                 title='Error',
+                                 description='No league loaded.')
+    if analytics is None:
+        return await clean_send(ctx.channel,
+                                 title='Error',
+                                 description='Stats need numpy installed on the bot host.')
+    # earlier seasons in the order given, the current one last: Elo and
+    # form are computed in that order
+    leagues = []
+    for name in others:
+        slug = league_slug(name)
+        if not storage.exists(lg.guild_id, slug):
+            return await clean_send(ctx.channel,
+                                     title='Error',
+                                     description=f"League '{name}' not found.")
+        other = await registry.open(lg.guild_id, slug)
+        if other is not lg and other not in leagues:
+            leagues.append(other)
+    leagues.append(lg)
+    key = ' '.join(f'{o.guild_id}:{o.slug}:{o.results_version}' for o in leagues)
+    st = season_stats.get(key)
+    if st is None:
+        with metrics.timer('stats_compute_seconds'):
+            st = analytics.SeasonStats([o.data for o in leagues])
+        season_stats.set(key, st)
+
+    seasons = ', '.join(o.data['league_name'] for o in leagues)
+    if member is not None:
+        rows = st.record_vs(str(member.id))
+        names = await members.resolve(ctx.guild, [p for p, _, _ in rows])
+        lines = [f"vs {names[p].display_name}: {w}–{l}" for p, w, l in sorted(rows, key=lambda r: -r[1])]
+        title = f"Head-to-head: {member.display_name}"
+    else:
+        rows = st.leaderboard()
+        names = await members.resolve(ctx.guild, [r[0] for r in rows])
+        lines = [f"{i}. {names[p].display_name} — {elo:.0f} Elo, {n} games, avg place {avg:.2f}, "
+                 f"{win:.0%} wins, form {form:.1f} pts/wk"
+                 for i, (p, elo, n, avg, win, form) in enumerate(rows, 1)]
+        title = "Season Stats"
+    desc = f"**Seasons:** {seasons}\n" + (clip_lines([], lines, DESCRIPTION_LIMIT - 200, 'more', keep_end=False) or "No games yet.")
+    await clean_send(ctx.channel, title=title, description=desc)
 
 @bot.command(name='viewleague')
 async def view_league(ctx):
-    if data_file is None:
+    lg = ctx.league
+    if lg is None:
         return await clean_send(ctx.channel,
                                  title='Error',
                                  description='No league loaded.')
 
-    # Build the embed
-    embed = make_embed('League Summary')
-
-    # For each player in the league
-    for pid in data['players']:
-        member = ctx.guild.get_member(pid)
-        pid_str = str(pid)
-
-        # Compute total points across all weeks
-        total_points = 0
-        for wk_data in data['weeks'].values():
-            total_points += wk_data.get('final_scores', {}).get(pid_str, 0)
-
-        # Build per-week breakdown
-        lines = [f"🏆 **Total:** {total_points} pts"]
-        for week in sorted(data['weeks'], key=lambda x: int(x)):
-            wk_data = data['weeks'][week]
-            # Points this week
-            pts = wk_data.get('final_scores', {}).get(pid_str, 0)
-            # Allowance info
-            allow = wk_data.get('allowances', {}).get(pid_str, {})
-            cat = allow.get('category', 'N/A').title()
-            c_lim = allow.get('card_limit', 'N/A')
-            p_lim = allow.get('price_limit', 'N/A')
-            # Cards added this week
-            cards = wk_data.get('card_additions', {}).get(pid_str, [])
-            cards_str = ", ".join(cards) if cards else "None"
-            lines.append(
-                f"• Week {week}: {pts} pts — {cat} ({c_lim} cards / ${p_lim}) — Cards: {cards_str}"
-            )
-
-        # Add a field for this player
-        embed.add_field(
-            name=member.display_name,
-            value="\n".join(lines),
-            inline=False
-        )
+    # Five players per page keeps a page under the 6000 character embed limit
+    per_page = 5
+    players = lg.data['players']
+    pages = lambda: max(1, -(-len(players) // per_page))
+
+    async def render(page):
+        st = lg.standings
+        chunk = [str(p) for p in players[page * per_page:(page + 1) * per_page]]
+        names = await members.resolve(ctx.guild, chunk)
+        embed = make_embed(f'League Summary ({page + 1}/{pages()})', lg=lg)
+        for pid in chunk:
+            weekly, allows, cards = st.weekly[pid], st.allowances[pid], st.cards[pid]
+            lines = []
+            for week in st.weeks:
+                allow = allows.get(week, {})
+                cat = allow.get('category', 'N/A').title()
+                c_lim = allow.get('card_limit', 'N/A')
+                p_lim = allow.get('price_limit', 'N/A')
+                cards_str = ", ".join(cards.get(week, [])) or "None"
+                lines.append(
+                    f"• Week {week}: {weekly.get(week, 0)} pts — {cat} ({c_lim} cards / ${p_lim}) — Cards: {cards_str}"
+                )
+            # long seasons keep the most recent weeks
+            value = clip_lines([f"🏆 **Total:** {st.total[pid]} pts"], lines, FIELD_LIMIT, 'earlier weeks')
+            embed.add_field(name=names[pid].display_name, value=value, inline=False)
+        return embed
 
-    await ctx.send(embed=embed)
+    await send_pages(ctx, pages, render, lambda: lg.standings.version, clean=False)
 
 @bot.command(name='editscores')
 async def edit_scores(ctx, week: int, game: int, member: discord.Member, placement: int):
-    if data_file is None:
+    lg = ctx.league
+    if lg is None:
         return await clean_send(ctx.channel,
                                  title='Error',
                                  description='No league loaded.')
+    data = lg.data
     w, g = str(week), str(game)
-    wk = data['weeks'].get(w)
-    if wk and wk['games'].get(g):
-        total = len(data['players'])
-        pts = 3 if placement == 1 else (0 if placement == total else 1)
-        wk['games'][g][str(member.id)] = {'placement': placement, 'points': pts}
-        save_data()
+    async with lg.lock:
+        wk = data['weeks'].get(w)
+        valid = bool(wk and wk['games'].get(g))
+        if valid:
+            total = len(data['players'])
+            pts = scoring.points_for(placement, total)
+            lg.record({'op': 'score_edited', 'week': w, 'game': g, 'user_id': str(member.id),
+                       'placement': placement, 'points': pts})
+    if valid:
         await clean_send(ctx.channel,
                          title='Score Updated',
                          description=f"W{w} G{g} {member.display_name} -> place {placement}")
@@ -369,10 +706,12 @@ async def edit_scores(ctx, week: int, game: int, member: discord.Member, placeme
 
 @bot.command(name='addcard')
 async def add_card(ctx):
-    if data_file is None:
+    lg = ctx.league
+    if lg is None:
         return await clean_send(ctx.channel,
                                  title='Error',
                                  description='No league loaded.')
+    data = lg.data
     # Ensure scores are finalized
     wk = str(len(data['weeks']))
     wk_data = data['weeks'][wk]
@@ -382,157 +721,312 @@ async def add_card(ctx):
                                  description='Week not finalized yet.')
 
     pid = str(ctx.author.id)
-    # Calculate cumulative allowance across all finalized weeks
-    total_allowed_cards = 0
-    total_allowed_price = 0.0
-    for w, wdata in data['weeks'].items():
-        if wdata.get('finalized'):
-            info = wdata['allowances'].get(pid, {})
-            total_allowed_cards += info.get('card_limit', 0)
-            total_allowed_price += info.get('price_limit', 0)
-    # Calculate total used across season
-    all_entries = [r for r in csv.DictReader(open(card_csv)) if r['user_id'] == pid]
-    total_used_cards = len(all_entries)
-    total_used_price = sum(float(r['price']) for r in all_entries)
-
-    # Prompt user with cumulative allowance
-    await clean_send(ctx.channel, title='Add Card',
-                     description=(
-                         f"You have used **{total_used_cards}/{total_allowed_cards}** cards "
-                         f"and **${total_used_price:.2f}/${total_allowed_price:.2f}** this season.\n"
-                         "Please enter a search term:"
-                     ))
-    def chk(m): return m.author == ctx.author and m.channel == ctx.channel
-    term = (await bot.wait_for('message', check=chk)).content.strip()
-
-    res = await scryfall_search(term)
-    if res.get('total_cards', 0) > 25:
-        return await clean_send(ctx.channel,
-                                 title='Error',
-                                 description='Too many results; narrow search.')
-    opts = res.get('data', [])
-    if not opts:
-        return await clean_send(ctx.channel,
-                                 title='Error',
-                                 description='No cards found.')
-    if len(opts) > 1:
-        menu = "\n".join(f"{i+1}. {c['name']}" for i, c in enumerate(opts))
-        await clean_send(ctx.channel, title='Choose Card', description=menu)
-        while True:
-            resp = await bot.wait_for('message', check=chk)
-            if resp.content.isdigit() and 1 <= int(resp.content) <= len(opts):
-                choice = opts[int(resp.content)-1]
-                break
-            await clean_send(ctx.channel,
-                             title='Error',
-                             description='Invalid selection.')
-    else:
-        choice = opts[0]
-    tcg = choice.get('tcgplayer_id')
-    if not tcg:
-        return await clean_send(ctx.channel,
-                                 title='Error',
-                                 description='No TCGplayer ID.')
-    det = await scryfall_get_tcg(tcg)
-    price_str = det.get('prices', {}).get('usd')
-    price = float(price_str) if price_str else 0.0
-    # Check cumulative allowance
-    if total_used_cards + 1 > total_allowed_cards or total_used_price + price > total_allowed_price:
-        return await clean_send(ctx.channel,
+    async with prompt_session(ctx) as chat:
+        if chat is None:
+            return
+        # Prompt user with cumulative allowance
+        await clean_send(ctx.channel, title='Add Card',
+                         description=allowance_text(lg, pid) + "\nPlease enter a search term (or `cancel`):")
+        term = (await chat.reply()).content.strip()
+
+        try:
+            res = await find_cards(term)
+        except ScryfallError:
+            return await clean_send(ctx.channel,
+                                     title='Error',
+                                     description='Scryfall is unavailable; try again later.')
+        if res.get('total_cards', 0) > 25:
+            return await clean_send(ctx.channel,
+                                     title='Error',
+                                     description='Too many results; narrow search.')
+        opts = res.get('data', [])
+        if not opts:
+            return await clean_send(ctx.channel,
+                                     title='Error',
+                                     description='No cards found.')
+        if len(opts) > 1:
+            menu = "\n".join(f"{i+1}. {c['name']}" for i, c in enumerate(opts))
+            await clean_send(ctx.channel, title='Choose Card', description=menu)
+            while True:
+                resp = await chat.reply()
+                if resp.content.isdigit() and 1 <= int(resp.content) <= len(opts):
+                    choice = opts[int(resp.content)-1]
+                    break
+                await clean_send(ctx.channel,
                                  title='Error',
-                                 description='Allowance exceeded for the season.')
-    with open(card_csv, 'a', newline='') as f:
-        csv.writer(f).writerow([wk, pid, choice['name'], tcg, f"{price:.2f}"])
-           
-    wk_data = data['weeks'][wk]        
-    wk_data.setdefault('card_additions', {})\
-           .setdefault(pid, [])\
-           .append(f"{choice['name']} (${price:.2f})")
-    save_data()
-    await clean_send(ctx.channel,
-                     title='Card Added',
-                     description=f"Added {choice['name']} — ${price:.2f}")
+                                 description='Invalid selection.')
+        else:
+            choice = opts[0]
+        tcg = choice.get('tcgplayer_id')
+        if not tcg:
+            return await clean_send(ctx.channel,
+                                     title='Error',
+                                     description='No TCGplayer ID.')
+        try:
+            det = await card_details(tcg)
+        except ScryfallError:
+            return await clean_send(ctx.channel,
+                                     title='Error',
+                                     description='Scryfall is unavailable; try again later.')
+        price = card_price(det)
+        if await commit_card(lg, pid, wk, choice['name'], tcg, price) is None:
+            return await clean_send(ctx.channel,
+                                     title='Error',
+                                     description='Allowance exceeded for the season.')
+        await clean_send(ctx.channel,
+                         title='Card Added',
+                         description=f"Added {choice['name']} — ${price:.2f}")
+
+# /addcard: the card is picked from autocomplete, so adding takes a single
+# Scryfall lookup (none with the local card index) and no chat round trips
+
+@bot.tree.command(name='addcard', description='Add a card to your pool for this season')
+@app_commands.describe(card='Card name')
+async def add_card_slash(interaction: discord.Interaction, card: str):
+    async def fail(msg):
+        if interaction.response.is_done():
+            return await interaction.followup.send(msg, ephemeral=True)
+        await interaction.response.send_message(msg, ephemeral=True)
+
+    lg = await registry.get(interaction.guild_id, interaction.channel_id) if interaction.guild_id else None
+    if lg is None:
+        return await fail('No league loaded.')
+    registry.pin(lg)
+    try:
+        wk = str(len(lg.data['weeks']))
+        if not lg.data['weeks'][wk].get('finalized'):
+            return await fail('Week not finalized yet.')
+        # ephemeral, so errors (and allowance details) stay with the user
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            det = await card_by_name(card)
+        except ScryfallError:
+            return await fail('Scryfall is unavailable; try again later.')
+        if det.get('object') == 'error' or not det.get('tcgplayer_id'):
+            return await fail(f"No card with a TCGplayer ID named '{card}'.")
+        price = card_price(det)
+        pid = str(interaction.user.id)
+        if await commit_card(lg, pid, wk, det['name'], det['tcgplayer_id'], price) is None:
+            return await fail('Allowance exceeded for the season.\n' + allowance_text(lg, pid))
+        await clean_send(interaction.channel, title='Card Added',
+                         description=f"{interaction.user.mention} added {det['name']} — ${price:.2f}")
+        await interaction.followup.send(f"Added {det['name']}.", ephemeral=True)
+    finally:
+        registry.unpin(lg)
+
+@add_card_slash.autocomplete('card')
+async def card_name_choices(interaction: discord.Interaction, current: str):
+    with metrics.timer('autocomplete_seconds'):
+        names = name_index.complete(current)
+    return [app_commands.Choice(name=n[:100], value=n[:100]) for n in names]
 
 @bot.command(name='removecard')
 async def remove_card(ctx):
-    if data_file is None:
+    lg = ctx.league
+    if lg is None:
         return await clean_send(ctx.channel,
                                  title='Error',
                                  description='No league loaded.')
-    wk = str(len(data['weeks']))
-    entries = [r for r in csv.DictReader(open(card_csv)) if r['week']==wk and r['user_id']==str(ctx.author.id)]
+    wk = str(len(lg.data['weeks']))
+    entries = lg.ledger.user_entries(str(ctx.author.id), wk)
     if not entries:
         return await clean_send(ctx.channel,
                                  title='Info',
                                  description='No cards to remove.')
     menu = "\n".join(f"{i+1}. {r['card_name']} (${r['price']})" for i,r in enumerate(entries))
-    await clean_send(ctx.channel,
-                     title='Remove Card',
-                     description=menu)
-    def chk(m): return m.author==ctx.author and m.channel==ctx.channel
-    while True:
-        resp = await bot.wait_for('message',check=chk)
-        if resp.content.isdigit() and 1<=int(resp.content)<=len(entries): idx=int(resp.content)-1; break
+    async with prompt_session(ctx) as chat:
+        if chat is None:
+            return
         await clean_send(ctx.channel,
-                         title='Error',
-                         description='Invalid selection.')
-    to_remove = entries[idx]
-    rows = [r for r in csv.DictReader(open(card_csv)) if r!=to_remove]
-    with open(card_csv,'w',newline='') as f:
-        w=csv.writer(f)
-        w.writerow(['week','user_id','card_name','tcgplayer_id','price'])
-        for r in rows:
-            w.writerow([r['week'],r['user_id'],r['card_name'],r['tcgplayer_id'],r['price']])
-    await clean_send(ctx.channel,
-                     title='Card Removed',
-                     description=f"Removed {to_remove['card_name']}")
+                         title='Remove Card',
+                         description=menu)
+        while True:
+            resp = await chat.reply()
+            if resp.content.isdigit() and 1<=int(resp.content)<=len(entries): idx=int(resp.content)-1; break
+            await clean_send(ctx.channel,
+                             title='Error',
+                             description='Invalid selection.')
+        to_remove = entries[idx]
+        async with lg.lock:
+            removed = lg.ledger.remove(to_remove['id'])
+            if removed:
+                lg.record({'op': 'card_removed', **{k: to_remove[k] for k in CARD_FIELDS}})
+        if not removed:
+            return await clean_send(ctx.channel,
+                                     title='Info',
+                                     description=f"{to_remove['card_name']} was already removed.")
+        await clean_send(ctx.channel,
+                         title='Card Removed',
+                         description=f"Removed {to_remove['card_name']}")
 
 @bot.command(name='viewcards')
 async def view_cards(ctx, member: discord.Member):
-    if data_file is None:
+    lg = ctx.league
+    if lg is None:
         return await clean_send(ctx.channel,
                                  title='Error',
                                  description='No league loaded.')
-    entries = {}
-    for r in csv.DictReader(open(card_csv)):
-        if r['user_id']==str(member.id):
-            entries.setdefault(r['week'],[]).append(r)
-    if not entries:
+    pid = str(member.id)
+    if not lg.ledger.active_weeks(pid):
         return await clean_send(ctx.channel,
                                  title='Info',
                                  description=f"No cards for {member.display_name}.")
-    caps = {'win':(1,5),'middle':(3,10),'last':(5,15)}
-    lines=[]
-    for wk,rs in sorted(entries.items(), key=lambda x:int(x[0])):
-        wk_data = data['weeks'].get(wk, {})
-        if wk_data.get('finalized'):
-            info = wk_data['allowances'].get(str(member.id),{})
-            c_lim, p_lim = info.get('card_limit', caps['middle'][0]), info.get('price_limit', caps['middle'][1])
-            cat = info.get('category','middle')
-        else:
-            c_lim, p_lim = caps['middle']
-            cat = 'middle'
-        cnt = len(rs)
-        tot = sum(float(r['price']) for r in rs)
-        lines.append(f"Week {wk} ({cat.title()}): {cnt}/{c_lim} cards — ${tot:.2f}/${p_lim}")
-        for r in rs:
-            lines.append(f"  • {r['card_name']}: ${r['price']}")
+    caps = scoring.CAPS
+    per_page = 8
+    pages = lambda: max(1, -(-len(lg.ledger.active_weeks(pid)) // per_page))
+
+    async def render(page):
+        weeks = lg.ledger.active_weeks(pid)[page * per_page:(page + 1) * per_page]
+        allows = lg.standings.allowances.get(pid, {})
+        lines=[]
+        for wk in weeks:
+            rs = lg.ledger.user_entries(pid, wk)
+            if wk in allows:
+                info = allows[wk]
+                c_lim, p_lim = info.get('card_limit', caps['middle'][0]), info.get('price_limit', caps['middle'][1])
+                cat = info.get('category','middle')
+            else:
+                c_lim, p_lim = caps['middle']
+                cat = 'middle'
+            cnt = len(rs)
+            tot = sum(float(r['price']) for r in rs)
+            lines.append(f"Week {wk} ({cat.title()}): {cnt}/{c_lim} cards — ${tot:.2f}/${p_lim}")
+            for r in rs:
+                lines.append(f"  • {r['card_name']}: ${r['price']}")
+        return make_embed(f"Cards for {member.display_name} ({page + 1}/{pages()})",
+                          clip_lines([], lines, DESCRIPTION_LIMIT, 'earlier lines'), lg)
+
+    await send_pages(ctx, pages, render, lambda: (lg.standings.version, lg.ledger.version))
+
+# Where time goes: commands, Discord, Scryfall and disk (admins only)
+
+def timing_lines(name: str, label: str, errors: str = None, unit=1000, suffix='ms') -> list:
+    lines = []
+    for labels, h in sorted(metrics.series(name), key=lambda x: -x[1].count):
+        key = labels.get(label, 'all')
+        line = (f"{key}: {h.count}× p50 {h.quantile(0.5) * unit:.0f}{suffix}"
+                f" p95 {h.quantile(0.95) * unit:.0f}{suffix} max {h.max * unit:.0f}{suffix}")
+        if errors:
+            failed = sum(v for (n, lbl), v in list(metrics.counters.items())
+                         if n == errors and dict(lbl).get(label) == labels.get(label))
+            if failed:
+                line += f" — {failed} errors ({failed / h.count:.0%})"
+        lines.append(line)
+    return lines
+
+@bot.command(name='botstats')
+@commands.has_guild_permissions(administrator=True)
+async def bot_stats(ctx):
+    embed = make_embed('Bot Stats', lg=registry.peek(ctx.guild.id, ctx.channel.id))
+    disk = [f"save {l}" for l in timing_lines('save_seconds', 'kind')] + \
+           [f"save size {l}" for l in timing_lines('save_bytes', 'kind', unit=1 / 1024, suffix='KiB')] + \
+           [f"card csv read {l}" for l in timing_lines('csv_read_seconds', 'kind')] + \
+           [f"card csv size {l}" for l in timing_lines('csv_read_bytes', 'kind', unit=1 / 1024, suffix='KiB')]
+    caches = [f"{c.ns} cache: {c.stats()['hit_rate']:.0%} hits, {c.stats()['size']} entries"
+              for c in (search_cache, price_cache)]
+    sections = [
+        ('Commands', timing_lines('command_seconds', 'command', 'command_errors')),
+        ('Discord', timing_lines('discord_rest_seconds', 'op', 'discord_rest_errors')
+                    + timing_lines('discord_gateway_seconds', 'op')),
+        ('Scryfall', timing_lines('scryfall_request_seconds', 'endpoint', 'scryfall_errors') + caches),
+        ('Disk', disk),
+    ]
+    for title, lines in sections:
+        embed.add_field(name=title, value=clip_lines([], lines, FIELD_LIMIT, 'more') or 'No data yet.',
+                        inline=False)
+    tracker.discard(ctx.channel)
+    await send_embed(ctx.channel, embed)
+
+@bot_stats.error
+async def bot_stats_error(ctx, error):
+    if isinstance(error, commands.CheckFailure):
+        await clean_send(ctx.channel, title='Error', description='Only server admins can view bot stats.')
+    else:
+        raise error
+
+# Re-price the league's cards at current Scryfall prices (admins only).
+# "preview" reports the changes without saving them.
+
+@bot.command(name='revalue')
+@commands.has_guild_permissions(administrator=True)
+async def revalue_cards(ctx, mode: str = 'apply'):
+    lg = ctx.league
+    if lg is None:
+        return await clean_send(ctx.channel,
+                                 title='Error',
+                                 description='No league loaded.')
+    apply = mode != 'preview'
+    await clean_send(ctx.channel, title='Revalue',
+                     description=f"Fetching prices for {len(lg.ledger.tcgplayer_ids())} cards…")
+    try:
+        changes = await revalue(lg.ledger, scryfall, apply=apply, lock=lg.lock, standings=lg.standings)
+    except ScryfallError:
+        return await clean_send(ctx.channel,
+                                 title='Error',
+                                 description='Scryfall is unavailable; try again later.')
+    count, old, new, by_user, movers = summarize(changes)
+    if apply and changes:
+        async with lg.lock:
+            lg.record({'op': 'cards_repriced', 'count': count,
+                       'old_total': round(old, 2), 'new_total': round(new, 2)})
+
+    names = await members.resolve(ctx.guild, by_user)
+    lines = [f"**{count}** cards changed: ${old:.2f} → ${new:.2f} ({new - old:+.2f})"]
+    lines += [f"{names[uid].display_name}: {delta:+.2f}"
+              for uid, delta in sorted(by_user.items(), key=lambda x: -abs(x[1]))]
+    if movers:
+        lines.append("**Biggest moves**")
+        lines += [f"{card}: ${o} → ${n}" for card, o, n in movers]
     await clean_send(ctx.channel,
-                     title=f"Cards for {member.display_name}",
-                     description="\n".join(lines))
+                     title='Revalue Applied' if apply else 'Revalue Preview',
+                     description=clip_lines([], lines, DESCRIPTION_LIMIT, 'more', keep_end=False))
+
+@revalue_cards.error
+async def revalue_error(ctx, error):
+    if isinstance(error, commands.CheckFailure):
+        await clean_send(ctx.channel, title='Error', description='Only server admins can revalue cards.')
+    else:
+        raise error
+
+# Rebuild the league's standings from its games and cards and report any
+# players whose incrementally kept values had drifted (admins only)
+
+@bot.command(name='checkstandings')
+@commands.has_guild_permissions(administrator=True)
+async def check_standings(ctx):
+    lg = ctx.league
+    if lg is None:
+        return await clean_send(ctx.channel,
+                                 title='Error',
+                                 description='No league loaded.')
+    drift = await lg.check_standings()
+    if not drift:
+        return await clean_send(ctx.channel, title='Standings Checked', description='No drift found.')
+    log.warning('Standings for %s drifted for %s; rebuilt from games', lg.slug, drift)
+    names = await members.resolve(ctx.guild, drift)
+    await clean_send(ctx.channel, title='Standings Rebuilt',
+                     description='Drifted: ' + ', '.join(names[p].display_name for p in drift))
+
+@check_standings.error
+async def check_standings_error(ctx, error):
+    if isinstance(error, commands.CheckFailure):
+        await clean_send(ctx.channel, title='Error', description='Only server admins can check standings.')
+    else:
+        raise error
 
 @bot.command(name='finalizeweek')
 async def finalize_week_cmd(ctx):
-    if data_file is None:
+    lg = ctx.league
+    if lg is None:
         return await clean_send(ctx.channel,
                                  title='Error',
                                  description='No league loaded.')
-    wk = str(len(data['weeks']))
-    if data['weeks'][wk].get('finalized'):
+    wk = str(len(lg.data['weeks']))
+    if lg.data['weeks'][wk].get('finalized'):
         return await clean_send(ctx.channel,
                                  title='Info',
                                  description=f"Week {wk} already finalized.")
-    await finalize_week_procedures(ctx.channel, wk)
+    await finalize_week_procedures(lg, ctx.channel, wk)
 
 if __name__ == '__main__':
     bot.run(token)
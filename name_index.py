@@ -0,0 +1,62 @@
+import asyncio, json, logging, os
+from bisect import bisect_left
+from persistence import atomic_write
+
+log = logging.getLogger(__name__)
+
+# In-process prefix index over card names for slash-command autocomplete.
+# Names are kept as a sorted array of casefolded keys; a lookup is one
+# bisect plus a short forward scan, with no I/O. The name list is cached
+# in a JSON file so a restart can answer immediately, and refreshed in
+# the background from the local card index or Scryfall's card-name catalog.
+
+class NameIndex:
+    def __init__(self, cache_path: str = 'card_names.json'):
+        self.cache_path = cache_path
+        self.keys = []
+        self.names = []
+        if os.path.exists(cache_path):
+            with open(cache_path) as f:
+                self._build(json.load(f))
+
+    def _build(self, names):
+        pairs = sorted({(n.casefold(), n) for n in names})
+        self.keys = [k for k, _ in pairs]
+        self.names = [n for _, n in pairs]
+
+    def __len__(self):
+        return len(self.names)
+
+    # Names starting with prefix, alphabetical, at most `limit`
+    # (Discord shows 25 autocomplete choices)
+
+    def complete(self, prefix: str, limit: int = 25) -> list:
+        key = ' '.join(prefix.casefold().split())
+        i = bisect_left(self.keys, key)
+        out = []
+        while i < len(self.keys) and len(out) < limit and self.keys[i].startswith(key):
+            out.append(self.names[i])
+            i += 1
+        return out
+
+    async def refresh(self, client, card_index=None):
+        names = []
+        if card_index is not None and card_index.ready:
+            names = await asyncio.to_thread(card_index.names)
+        if not names:
+            names = await client.card_names()
+        if not names:
+            return
+        # built off-loop, then swapped in with one assignment
+        fresh = NameIndex.__new__(NameIndex)
+        await asyncio.to_thread(fresh._build, names)
+        self.keys, self.names = fresh.keys, fresh.names
+        await asyncio.to_thread(atomic_write, self.cache_path, json.dumps(self.names))
+
+    async def refresh_forever(self, client, card_index=None, interval: float = 24 * 3600):
+        while True:
+            try:
+                await self.refresh(client, card_index)
+            except Exception as e:
+                log.warning('Refreshing card names failed: %r', e)
+            await asyncio.sleep(interval)
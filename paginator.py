@@ -0,0 +1,91 @@
+import discord
+
+# Discord embed limits
+MAX_FIELDS = 25
+FIELD_LIMIT = 1024
+DESCRIPTION_LIMIT = 4096
+EMBED_LIMIT = 6000
+
+# Join lines, keeping the head and as many lines as fit in limit.
+# Dropped lines are replaced with a "… N earlier" note. By default the
+# last lines are kept, so the most recent entries stay visible; with
+# keep_end=False the first ones are (rankings).
+
+def clip_lines(head: list, lines: list, limit: int, what: str = 'earlier', keep_end: bool = True) -> str:
+    text = "\n".join(head + lines)
+    if len(text) <= limit:
+        return text
+    kept, size = [], len("\n".join(head)) + 40
+    for line in (reversed(lines) if keep_end else lines):
+        size += len(line) + 1
+        if size > limit:
+            break
+        kept.append(line)
+    note = f"… {len(lines) - len(kept)} {what}"
+    if keep_end:
+        return "\n".join(head + [note] + kept[::-1])[:limit]
+    return "\n".join(head + kept + [note])[:limit]
+
+# Prev/next buttons over pages rendered on demand. count() gives the
+# number of pages, render(page) builds one embed (async), version() keys
+# the data it reads; rendered pages are cached until version() changes.
+# Only the user who ran the command can turn pages.
+
+class Paginator(discord.ui.View):
+    def __init__(self, count, render, version, owner_id: int, timeout: float = 300):
+        super().__init__(timeout=timeout)
+        self.count = count
+        self.render_page = render
+        self.version = version
+        self.owner_id = owner_id
+        self.page = 0
+        self.pages = {}
+        self.seen = None
+        self.message = None
+
+    async def render(self, page: int) -> discord.Embed:
+        v = self.version()
+        if v != self.seen:
+            self.pages.clear()
+            self.seen = v
+        if page not in self.pages:
+            self.pages[page] = await self.render_page(page)
+        return self.pages[page]
+
+    def _sync_buttons(self, total: int):
+        self.prev_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= total - 1
+
+    # Render the first page; the view is dropped when there is only one
+
+    async def first(self):
+        total = self.count()
+        self._sync_buttons(total)
+        return await self.render(0), (self if total > 1 else None)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message('Run the command yourself to browse.', ephemeral=True)
+            return False
+        return True
+
+    async def _turn(self, interaction: discord.Interaction, step: int):
+        total = self.count()
+        self.page = max(0, min(self.page + step, total - 1))
+        self._sync_buttons(total)
+        await interaction.response.edit_message(embed=await self.render(self.page), view=self)
+
+    @discord.ui.button(label='◀', style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._turn(interaction, -1)
+
+    @discord.ui.button(label='▶', style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._turn(interaction, 1)
+
+    async def on_timeout(self):
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
@@ -0,0 +1,91 @@
+import asyncio, json, logging, os, tempfile, time
+from metrics import metrics, BYTES
+
+log = logging.getLogger(__name__)
+
+# Write text to path via temp file + fsync + rename, so readers and crashes
+# only ever see the old or the new contents
+
+def atomic_write(path: str, text: str):
+    d = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=d)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    if hasattr(os, 'O_DIRECTORY'):
+        dfd = os.open(d, os.O_DIRECTORY)
+        try:
+            os.fsync(dfd)
+        finally:
+            os.close(dfd)
+
+# Write-behind JSON persistence for one league state dict.
+# mark_dirty() coalesces every change made within `delay` seconds into a
+# single write. The snapshot is taken on the event loop with the C JSON
+# codec (consistent and fast); pretty-printing and disk I/O run in a worker
+# thread. Changes made while a write is in flight schedule another one.
+
+class WriteBehindStore:
+    def __init__(self, path: str, state: dict, delay: float = 2.0):
+        self.path = path
+        self.state = state
+        self.delay = delay
+        self.dirty = False
+        self._handle = None
+        self._task = None
+
+    def mark_dirty(self):
+        self.dirty = True
+        if self._handle is None and self._task is None:
+            self._handle = asyncio.get_running_loop().call_later(self.delay, self._start)
+
+    def _start(self):
+        self._handle = None
+        self._task = asyncio.create_task(self._write())
+
+    async def _write(self):
+        try:
+            self.dirty = False
+            snapshot = json.loads(json.dumps(self.state))
+            await asyncio.to_thread(self.write_snapshot, snapshot)
+        except Exception as e:
+            self.dirty = True
+            log.warning('Saving %s failed: %r', self.path, e)
+        finally:
+            self._task = None
+            if self.dirty and self._handle is None:
+                self._handle = asyncio.get_running_loop().call_later(self.delay, self._start)
+
+    def write_snapshot(self, snapshot: dict):
+        t0 = time.perf_counter()
+        text = json.dumps(snapshot, indent=2)
+        atomic_write(self.path, text)
+        # league_<guild>_<slug>.json -> 'league', pending_scores.json -> 'pending'
+        kind = os.path.basename(self.path).split('_')[0].split('.')[0]
+        metrics.observe('save_seconds', time.perf_counter() - t0, kind=kind)
+        metrics.observe('save_bytes', len(text), buckets=BYTES, kind=kind)
+
+    # Write any pending changes now (used on league switch and shutdown)
+
+    async def flush(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._task is not None:
+            await self._task
+            if self._handle is not None:
+                self._handle.cancel()
+                self._handle = None
+        if self.dirty:
+            self._task = asyncio.create_task(self._write())
+            await self._task
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
@@ -0,0 +1,144 @@
+import asyncio, json, logging, os, time
+from collections import OrderedDict
+from persistence import atomic_write
+
+log = logging.getLogger(__name__)
+
+# Leagues loaded on demand and shared by every guild the bot serves.
+# Each guild (or guild:channel with per_channel) has an active league,
+# persisted in active_path. Loaded leagues are kept in LRU order; beyond
+# max_loaded, or after idle_seconds without use, they are flushed and
+# dropped from memory. Pinned or locked leagues are never evicted.
+
+class LeagueRegistry:
+    def __init__(self, storage, *, max_loaded: int = 32, idle_seconds: float = 1800,
+                 per_channel: bool = False, active_path: str = 'active_leagues.json'):
+        self.storage = storage
+        self.max_loaded = max_loaded
+        self.idle_seconds = idle_seconds
+        self.per_channel = per_channel
+        self.active_path = active_path
+        self.active = {}
+        if os.path.exists(active_path):
+            with open(active_path) as f:
+                self.active = json.load(f)
+        self.loaded = OrderedDict()   # (guild_id, slug) -> League
+        self._loading = {}            # (guild_id, slug) -> future of an in-flight open
+
+    def scope(self, guild_id, channel_id=None) -> str:
+        if self.per_channel and channel_id is not None:
+            return f'{guild_id}:{channel_id}'
+        return str(guild_id)
+
+    def active_slug(self, guild_id, channel_id=None):
+        return self.active.get(self.scope(guild_id, channel_id))
+
+    # Already-loaded active league, without touching storage
+
+    def peek(self, guild_id, channel_id=None):
+        slug = self.active_slug(guild_id, channel_id)
+        return self.loaded.get((str(guild_id), slug)) if slug else None
+
+    async def get(self, guild_id, channel_id=None):
+        slug = self.active_slug(guild_id, channel_id)
+        if slug is None:
+            return None
+        key = (str(guild_id), slug)
+        if key not in self.loaded and key not in self._loading and not self.storage.exists(*key):
+            return None
+        return await self.open(*key)
+
+    async def open(self, guild_id: str, slug: str):
+        key = (guild_id, slug)
+        lg = self.loaded.get(key)
+        if lg is None:
+            fut = self._loading.get(key)
+            if fut is not None:
+                lg = await asyncio.shield(fut)
+            else:
+                fut = self._loading[key] = asyncio.ensure_future(self.storage.open(guild_id, slug))
+                try:
+                    lg = await asyncio.shield(fut)
+                finally:
+                    del self._loading[key]
+                self.loaded[key] = lg
+                await self._evict(keep=key)
+        self.loaded.move_to_end(key)
+        lg.last_used = time.monotonic()
+        return lg
+
+    # Replaces a league of the same name. Returns None (and changes nothing)
+    # while that league is loading or in use, as for eviction
+
+    async def create(self, guild_id: str, slug: str, league_name: str, players: list, channel_id=None):
+        key = (guild_id, slug)
+        if key in self._loading:
+            return None
+        old = self.loaded.get(key)
+        if old is not None:
+            if not self._evictable(old):
+                return None
+            await old.flush()
+            if self.loaded.get(key) is not old or not self._evictable(old):
+                return None
+            del self.loaded[key]
+            old.close()
+        lg = await self.storage.create(guild_id, slug, league_name, players)
+        self.loaded[key] = lg
+        await self.activate(guild_id, slug, channel_id)
+        await self._evict(keep=key)
+        return lg
+
+    async def activate(self, guild_id, slug: str, channel_id=None):
+        self.active[self.scope(guild_id, channel_id)] = slug
+        await asyncio.to_thread(atomic_write, self.active_path, json.dumps(self.active, indent=2))
+
+    def pin(self, lg):
+        lg.pins += 1
+        lg.last_used = time.monotonic()
+
+    def unpin(self, lg):
+        lg.pins -= 1
+        lg.last_used = time.monotonic()
+
+    # --- Eviction ---
+
+    def _evictable(self, lg) -> bool:
+        return lg.pins == 0 and not lg.lock.locked()
+
+    async def _unload(self, key):
+        lg = self.loaded[key]
+        await lg.flush()
+        # re-check after the flush: someone may have started using it meanwhile
+        if self.loaded.get(key) is lg and self._evictable(lg):
+            del self.loaded[key]
+            lg.close()
+
+    # keep: the league being opened, not yet pinned by its caller
+
+    async def _evict(self, keep=None):
+        for key in list(self.loaded):
+            if len(self.loaded) <= self.max_loaded:
+                break
+            if key != keep and key in self.loaded and self._evictable(self.loaded[key]):
+                await self._unload(key)
+
+    async def evict_idle(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        for key, lg in list(self.loaded.items()):
+            if lg.last_used < cutoff and self._evictable(lg):
+                await self._unload(key)
+
+    async def sweep_forever(self, interval: float = 60):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                log.warning('League eviction failed: %r', e)
+
+    async def close(self):
+        for key, lg in list(self.loaded.items()):
+            await lg.flush()
+            lg.close()
+        self.loaded.clear()
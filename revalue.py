@@ -0,0 +1,122 @@
+import argparse, asyncio, glob, os
+from card_ledger import CsvCardLedger
+from scryfall import SCRYFALL_API, ScryfallClient
+
+# Re-price cards from current Scryfall prices. Each tcgplayer id is
+# fetched once, through /cards/collection in chunks of 75. The batch job
+# applies each chunk's prices as it arrives; a live league gets them all
+# at once.
+#
+# Batch job over stored leagues (run it while the bot is stopped):
+#   python revalue.py [directory] [--db mtg_league.sqlite3] [--dry-run]
+
+# {tcgplayer_id: usd} per completed chunk; cards without a USD price are skipped
+
+async def price_chunks(client, tcg_ids, concurrency: int = 4):
+    async for cards in client.collection(tcg_ids, concurrency=concurrency):
+        yield {str(c['tcgplayer_id']): float(c['prices']['usd'])
+               for c in cards if c.get('prices', {}).get('usd')}
+
+# [(row, old price, new price)] for the ledger's rows whose price differs.
+# With apply the ledger is updated; save() still has to be called.
+
+def apply_prices(ledger, prices: dict, apply: bool = True) -> list:
+    if apply:
+        return [(dict(row), old, row['price']) for row, old in ledger.reprice(prices)]
+    changes = []
+    for tcg, price in prices.items():
+        new = f"{price:.2f}"
+        for eid in ledger.by_tcg.get(tcg, []):
+            row = ledger.entries[eid]
+            if row['price'] != new:
+                changes.append((dict(row), row['price'], new))
+    return changes
+
+# Re-price one live league's ledger. Every chunk is fetched before any
+# price is applied, so a failed request leaves the ledger untouched. lock
+# guards the update and the save, which may rewrite the whole CSV off-loop
+# and must not overlap a card being added or removed. Standings, if given,
+# follow the new prices.
+
+async def revalue(ledger, client, *, apply: bool = True, lock=None, standings=None,
+                  concurrency: int = 4) -> list:
+    prices = {}
+    async for chunk in price_chunks(client, ledger.tcgplayer_ids(), concurrency):
+        prices.update(chunk)
+
+    async def update():
+        changes = apply_prices(ledger, prices, apply)
+        if apply:
+            if standings is not None:
+                for row, old, _ in changes:
+                    standings.reprice_card(row, old)
+            await asyncio.to_thread(ledger.save)
+        return changes
+
+    if lock is None:
+        return await update()
+    async with lock:
+        return await update()
+
+# Totals for a report: (cards changed, old spend, new spend, per-player
+# spend deltas, biggest single-card moves first)
+
+def summarize(changes: list, top: int = 10):
+    old = sum(float(o) for _, o, _ in changes)
+    new = sum(float(n) for _, _, n in changes)
+    by_user = {}
+    for row, o, n in changes:
+        by_user[row['user_id']] = by_user.get(row['user_id'], 0.0) + float(n) - float(o)
+    movers, seen = [], set()
+    for row, o, n in sorted(changes, key=lambda c: -abs(float(c[2]) - float(c[1]))):
+        if row['tcgplayer_id'] not in seen:
+            seen.add(row['tcgplayer_id'])
+            movers.append((row['card_name'], o, n))
+        if len(movers) == top:
+            break
+    return len(changes), old, new, by_user, movers
+
+# Batch job: ids are deduplicated across every ledger, so a card held in
+# several leagues is fetched once
+
+async def revalue_all(ledgers: dict, client, apply: bool = True, concurrency: int = 4) -> dict:
+    ids = set()
+    for ledger in ledgers.values():
+        ids.update(ledger.tcgplayer_ids())
+    changes = {name: [] for name in ledgers}
+    async for prices in price_chunks(client, sorted(ids), concurrency):
+        for name, ledger in ledgers.items():
+            changes[name] += apply_prices(ledger, prices, apply)
+    if apply:
+        for ledger in ledgers.values():
+            ledger.save()
+    return changes
+
+async def main(args):
+    if args.db:
+        from sqlite_storage import SqliteCardLedger, connect
+        conn = connect(args.db)
+        ledgers = {f'{g}/{s}': SqliteCardLedger(conn, lid)
+                   for lid, g, s in conn.execute('SELECT id, guild_id, slug FROM leagues ORDER BY id')}
+    else:
+        ledgers = {os.path.basename(p): CsvCardLedger(p)
+                   for p in sorted(glob.glob(os.path.join(args.directory, 'cards_*.csv')))}
+    client = ScryfallClient(base_url=args.api)
+    try:
+        changes = await revalue_all(ledgers, client, not args.dry_run, args.concurrency)
+    finally:
+        await client.close()
+    for name, ch in changes.items():
+        count, old, new, _, movers = summarize(ch)
+        print(f'{name}: {count} cards changed, ${old:.2f} -> ${new:.2f} ({new - old:+.2f})')
+        for card, o, n in movers:
+            print(f'  {card}: ${o} -> ${n}')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Re-price league card ledgers from Scryfall')
+    parser.add_argument('directory', nargs='?', default='.', help='folder with cards_*.csv files')
+    parser.add_argument('--db', help='re-price the leagues in this SQLite database instead')
+    parser.add_argument('--dry-run', action='store_true', help='report changes without saving them')
+    parser.add_argument('--concurrency', type=int, default=4, help='collection requests in flight')
+    parser.add_argument('--api', default=SCRYFALL_API)
+    asyncio.run(main(parser.parse_args()))
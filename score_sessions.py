@@ -0,0 +1,52 @@
+import json, os
+from persistence import WriteBehindStore
+
+# Open scoring messages keyed by str(message id), persisted so a restart
+# doesn't lose games in progress. Each session records where it lives
+# (guild, slug, channel), how votes arrive (mode), who plays and the
+# responses so far:
+#   {'guild', 'slug', 'channel', 'mode', 'week', 'game', 'players': [uid], 'responses': {uid: {...}}}
+
+class ScoreSessions:
+    def __init__(self, path: str = 'pending_scores.json', delay: float = 1.0):
+        self.sessions = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.sessions.update(json.load(f))
+        self.store = WriteBehindStore(path, self.sessions, delay=delay)
+
+    def get(self, mid):
+        return self.sessions.get(str(mid))
+
+    def open(self, mid, info: dict):
+        self.sessions[str(mid)] = info
+        self.store.mark_dirty()
+
+    def close(self, mid):
+        if self.sessions.pop(str(mid), None) is not None:
+            self.store.mark_dirty()
+
+    # Close every game of a league's week; returns how many were open
+
+    def close_week(self, guild, slug: str, week: str) -> int:
+        mids = [mid for mid, info in self.sessions.items()
+                if str(info['guild']) == str(guild) and info['slug'] == slug and info['week'] == week]
+        for mid in mids:
+            del self.sessions[mid]
+        if mids:
+            self.store.mark_dirty()
+        return len(mids)
+
+    # Call after changing a session's responses
+
+    def touch(self):
+        self.store.mark_dirty()
+
+    def items(self):
+        return list(self.sessions.items())
+
+    def __contains__(self, mid):
+        return str(mid) in self.sessions
+
+    async def flush(self):
+        await self.store.flush()
@@ -0,0 +1,56 @@
+# League scoring rules, free of Discord and storage: game points by
+# placement, a finalized week's scores and next-week card allowances, and
+# the week's card additions from a card ledger. Used by the bot when a
+# week is finalized and by audit.py to recompute stored weeks.
+
+# Allowance category -> (card limit, price limit)
+CAPS = {'win': (1, 5), 'middle': (3, 10), 'last': (5, 15)}
+
+def points_for(place: int, num_players: int) -> int:
+    return 3 if place == 1 else (0 if place == num_players else 1)
+
+def compute_final_scores(wk_data: dict) -> dict:
+    final_scores = {}
+    for game in wk_data['games'].values():
+        for pid, rec in game.items():
+            final_scores[pid] = final_scores.get(pid, 0) + rec['points']
+    return final_scores
+
+# Allowances based on average placement: always first wins, always last
+# gets the most help, everyone else is in the middle
+
+def compute_allowances(wk_data: dict, players: list) -> dict:
+    num_games = wk_data.get('num_games', len(wk_data['games']))
+    allowances = {}
+    for pid in players:
+        pid_str = str(pid)
+        total_place = sum(g[pid_str]['placement'] for g in wk_data['games'].values())
+        avg_place = total_place / num_games
+        if avg_place == 1:
+            cat = 'win'
+        elif avg_place == len(players):
+            cat = 'last'
+        else:
+            cat = 'middle'
+        card_lim, price_lim = CAPS[cat]
+        allowances[pid_str] = {
+            'category': cat,
+            'card_limit': card_lim,
+            'price_limit': price_lim
+        }
+    return allowances
+
+def collect_card_additions(ledger, week: str) -> dict:
+    return {
+        uid: [f"{r['card_name']} (${r['price']})" for r in rows]
+        for uid, rows in ledger.week_entries(week).items()
+    }
+
+# Everything a week_finalized event carries
+
+def finalize_week(data: dict, week: str, ledger) -> dict:
+    wk_data = data['weeks'][week]
+    return {'op': 'week_finalized', 'week': week,
+            'final_scores': compute_final_scores(wk_data),
+            'allowances': compute_allowances(wk_data, data['players']),
+            'card_additions': collect_card_additions(ledger, week)}
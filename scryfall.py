@@ -0,0 +1,147 @@
+import asyncio, random, urllib.parse
+import aiohttp
+from metrics import metrics
+
+SCRYFALL_API = 'https://api.scryfall.com'
+
+class ScryfallError(Exception):
+    pass
+
+# Token bucket limiter. Waiters queue on an asyncio.Lock, which wakes them
+# in FIFO order, so concurrent lookups are served fairly.
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            while True:
+                now = loop.time()
+                if self.updated is not None:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+# Long-lived Scryfall client: one pooled session, rate limited to Scryfall's
+# ~10 req/s guidance, retrying 429/5xx with exponential backoff.
+
+class ScryfallClient:
+    def __init__(self, *, base_url: str = SCRYFALL_API, rate: float = 10, retries: int = 4,
+                 backoff: float = 0.5, search_cache=None, price_cache=None):
+        self.base_url = base_url.rstrip('/')
+        self.bucket = TokenBucket(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.search_cache = search_cache
+        self.price_cache = price_cache
+        self.session = None
+
+    async def open(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=8, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=15),
+                headers={'User-Agent': 'MTGLeagueBot/1.0', 'Accept': 'application/json'},
+            )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def request(self, method: str, path: str, **kwargs) -> dict:
+        if self.session is None:
+            await self.open()
+        url = self.base_url + path
+        # ids dropped so every lookup of a kind shares one metrics series
+        endpoint = '/'.join(p for p in path.split('?')[0].split('/') if not p.isdigit())
+        for attempt in range(self.retries + 1):
+            await self.bucket.acquire()
+            delay = self.backoff * 2 ** attempt + random.uniform(0, self.backoff)
+            try:
+                with metrics.timer('scryfall_request_seconds', endpoint=endpoint):
+                    async with self.session.request(method, url, **kwargs) as resp:
+                        if resp.status == 429 or resp.status >= 500:
+                            metrics.inc('scryfall_errors', endpoint=endpoint, status=resp.status)
+                            retry_after = resp.headers.get('Retry-After')
+                            if retry_after and retry_after.isdigit():
+                                delay = max(delay, float(retry_after))
+                            if attempt == self.retries:
+                                raise ScryfallError(f'{method} {path} failed with HTTP {resp.status}')
+                        else:
+                            return await resp.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                metrics.inc('scryfall_errors', endpoint=endpoint, status=type(e).__name__)
+                if attempt == self.retries:
+                    raise ScryfallError(f'{method} {path} failed: {e}') from e
+            await asyncio.sleep(delay)
+
+    # Responses are cached by normalized query / tcgplayer id; errors are never cached
+
+    async def search(self, query: str) -> dict:
+        key = ' '.join(query.lower().split())
+        if self.search_cache is not None:
+            cached = self.search_cache.get(key)
+            if cached is not None:
+                return cached
+        res = await self.request('GET', f'/cards/search?format=json&q={urllib.parse.quote(query)}')
+        if self.search_cache is not None and res.get('object') != 'error':
+            self.search_cache.set(key, res)
+        return res
+
+    async def named(self, name: str) -> dict:
+        key = 'name:' + ' '.join(name.lower().split())
+        if self.price_cache is not None:
+            cached = self.price_cache.get(key)
+            if cached is not None:
+                return cached
+        res = await self.request('GET', f'/cards/named?exact={urllib.parse.quote(name)}')
+        if self.price_cache is not None and res.get('object') != 'error':
+            self.price_cache.set(key, res)
+        return res
+
+    async def card_names(self) -> list:
+        return (await self.request('GET', '/catalog/card-names')).get('data', [])
+
+    async def get_tcg(self, card_id: int) -> dict:
+        key = str(card_id)
+        if self.price_cache is not None:
+            cached = self.price_cache.get(key)
+            if cached is not None:
+                return cached
+        res = await self.request('GET', f'/cards/tcgplayer/{card_id}')
+        if self.price_cache is not None and res.get('object') != 'error':
+            self.price_cache.set(key, res)
+        return res
+
+    # Cards for many tcgplayer ids through /cards/collection, 75 identifiers
+    # per request with up to `concurrency` requests in flight. Yields each
+    # chunk's cards as soon as that request completes.
+
+    async def collection(self, tcg_ids, chunk_size: int = 75, concurrency: int = 4):
+        ids = list(tcg_ids)
+        sem = asyncio.Semaphore(concurrency)
+
+        async def fetch(chunk):
+            async with sem:
+                body = {'identifiers': [{'tcgplayer_id': int(t)} for t in chunk]}
+                return await self.request('POST', '/cards/collection', json=body)
+
+        tasks = [asyncio.ensure_future(fetch(ids[i:i + chunk_size]))
+                 for i in range(0, len(ids), chunk_size)]
+        try:
+            for done in asyncio.as_completed(tasks):
+                res = await done
+                yield [c for c in res.get('data', []) if c.get('tcgplayer_id')]
+        finally:
+            for t in tasks:
+                t.cancel()
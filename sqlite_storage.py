@@ -0,0 +1,341 @@
+import argparse, glob, os, re, sqlite3
+from card_ledger import CardLedger, CsvCardLedger
+from journal import apply_event, load_state
+from metrics import metrics
+from storage import League, Storage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leagues (
+    id INTEGER PRIMARY KEY,
+    guild_id TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (guild_id, slug)
+);
+CREATE TABLE IF NOT EXISTS players (
+    league_id INTEGER NOT NULL REFERENCES leagues (id) ON DELETE CASCADE,
+    user_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (league_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS weeks (
+    league_id INTEGER NOT NULL REFERENCES leagues (id) ON DELETE CASCADE,
+    week INTEGER NOT NULL,
+    num_games INTEGER NOT NULL,
+    finalized INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (league_id, week)
+);
+CREATE TABLE IF NOT EXISTS games (
+    league_id INTEGER NOT NULL REFERENCES leagues (id) ON DELETE CASCADE,
+    week INTEGER NOT NULL,
+    game INTEGER NOT NULL,
+    PRIMARY KEY (league_id, week, game)
+);
+CREATE TABLE IF NOT EXISTS placements (
+    league_id INTEGER NOT NULL REFERENCES leagues (id) ON DELETE CASCADE,
+    week INTEGER NOT NULL,
+    game INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    placement INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    PRIMARY KEY (league_id, week, game, user_id)
+);
+CREATE INDEX IF NOT EXISTS placements_user ON placements (league_id, user_id);
+CREATE TABLE IF NOT EXISTS final_scores (
+    league_id INTEGER NOT NULL REFERENCES leagues (id) ON DELETE CASCADE,
+    week INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    points INTEGER NOT NULL,
+    PRIMARY KEY (league_id, week, user_id)
+);
+CREATE INDEX IF NOT EXISTS final_scores_user ON final_scores (league_id, user_id);
+CREATE TABLE IF NOT EXISTS allowances (
+    league_id INTEGER NOT NULL REFERENCES leagues (id) ON DELETE CASCADE,
+    week INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    category TEXT NOT NULL,
+    card_limit INTEGER NOT NULL,
+    price_limit REAL NOT NULL,
+    PRIMARY KEY (league_id, week, user_id)
+);
+CREATE INDEX IF NOT EXISTS allowances_user ON allowances (league_id, user_id);
+CREATE TABLE IF NOT EXISTS card_additions (
+    id INTEGER PRIMARY KEY,
+    league_id INTEGER NOT NULL REFERENCES leagues (id) ON DELETE CASCADE,
+    week INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    card_name TEXT NOT NULL,
+    tcgplayer_id TEXT NOT NULL,
+    price TEXT NOT NULL,
+    removed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS card_additions_user ON card_additions (league_id, user_id, week);
+CREATE INDEX IF NOT EXISTS card_additions_week ON card_additions (league_id, week);
+"""
+
+# One connection per process, shared by every league
+
+_conn = None
+
+def connect(path: str) -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(path)
+        _conn.execute('PRAGMA journal_mode=WAL')
+        _conn.execute('PRAGMA synchronous=NORMAL')
+        _conn.execute('PRAGMA foreign_keys=ON')
+        _conn.executescript(SCHEMA)
+    return _conn
+
+# Card ledger rows live in card_additions; removal only flags the row so
+# the week's card_additions history matches the JSON backend
+
+class SqliteCardLedger(CardLedger):
+    def __init__(self, conn: sqlite3.Connection, league_id: int):
+        super().__init__()
+        self.conn = conn
+        self.league_id = league_id
+        for rid, *vals in conn.execute(
+            'SELECT id, week, user_id, card_name, tcgplayer_id, price FROM card_additions'
+            ' WHERE league_id = ? AND removed = 0 ORDER BY id', (league_id,)
+        ):
+            row = dict(zip(('week', 'user_id', 'card_name', 'tcgplayer_id', 'price'), vals))
+            row['week'] = str(row['week'])
+            self._index(row, rid)
+
+    def _append(self, row):
+        with self.conn:
+            cur = self.conn.execute(
+                'INSERT INTO card_additions (league_id, week, user_id, card_name, tcgplayer_id, price)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                (self.league_id, int(row['week']), row['user_id'], row['card_name'],
+                 row['tcgplayer_id'], row['price'])
+            )
+        return cur.lastrowid
+
+    def _delete(self, row, rid):
+        with self.conn:
+            self.conn.execute('UPDATE card_additions SET removed = 1 WHERE id = ?', (rid,))
+
+    def _reprice(self, rows):
+        with self.conn:
+            self.conn.executemany('UPDATE card_additions SET price = ? WHERE id = ?',
+                                  [(r['price'], self.keys[r['id']]) for r in rows])
+
+# Applies journal events to the in-memory state and mirrors them as row
+# changes, one transaction per event. Card events are written by the ledger.
+
+class SqliteLeagueStore:
+    def __init__(self, conn: sqlite3.Connection, league_id: int, state: dict):
+        self.conn = conn
+        self.league_id = league_id
+        self.state = state
+
+    def record(self, ev: dict) -> dict:
+        apply_event(self.state, ev)
+        with metrics.timer('save_seconds', kind='sqlite'), self.conn:
+            write_event(self.conn, self.league_id, ev)
+        return ev
+
+    async def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+def write_event(conn, lid: int, ev: dict):
+    op = ev['op']
+    if op == 'create':
+        conn.execute('DELETE FROM players WHERE league_id = ?', (lid,))
+        conn.executemany(
+            'INSERT INTO players (league_id, user_id, position) VALUES (?, ?, ?)',
+            [(lid, str(pid), i) for i, pid in enumerate(ev['players'])]
+        )
+    elif op == 'week_opened':
+        conn.execute('INSERT INTO weeks (league_id, week, num_games) VALUES (?, ?, ?)',
+                     (lid, int(ev['week']), ev['num_games']))
+    elif op == 'game_recorded':
+        wk, g = int(ev['week']), int(ev['game'])
+        conn.execute('INSERT OR IGNORE INTO games (league_id, week, game) VALUES (?, ?, ?)', (lid, wk, g))
+        conn.executemany(
+            'INSERT OR REPLACE INTO placements (league_id, week, game, user_id, placement, points)'
+            ' VALUES (?, ?, ?, ?, ?, ?)',
+            [(lid, wk, g, uid, r['placement'], r['points']) for uid, r in ev['responses'].items()]
+        )
+    elif op == 'score_edited':
+        conn.execute(
+            'INSERT OR REPLACE INTO placements (league_id, week, game, user_id, placement, points)'
+            ' VALUES (?, ?, ?, ?, ?, ?)',
+            (lid, int(ev['week']), int(ev['game']), ev['user_id'], ev['placement'], ev['points'])
+        )
+    elif op == 'week_finalized':
+        wk = int(ev['week'])
+        conn.execute('UPDATE weeks SET finalized = 1 WHERE league_id = ? AND week = ?', (lid, wk))
+        conn.executemany(
+            'INSERT OR REPLACE INTO final_scores (league_id, week, user_id, points) VALUES (?, ?, ?, ?)',
+            [(lid, wk, uid, pts) for uid, pts in ev['final_scores'].items()]
+        )
+        conn.executemany(
+            'INSERT OR REPLACE INTO allowances (league_id, week, user_id, category, card_limit, price_limit)'
+            ' VALUES (?, ?, ?, ?, ?, ?)',
+            [(lid, wk, uid, a['category'], a['card_limit'], a['price_limit'])
+             for uid, a in ev['allowances'].items()]
+        )
+
+# Rebuild the league dict in the same shape as league_*.json
+
+def read_league(conn, lid: int) -> dict:
+    name, = conn.execute('SELECT name FROM leagues WHERE id = ?', (lid,)).fetchone()
+    data = {
+        'league_name': name,
+        'players': [int(u) for u, in conn.execute(
+            'SELECT user_id FROM players WHERE league_id = ? ORDER BY position', (lid,))],
+        'weeks': {},
+    }
+    weeks = data['weeks']
+    for wk, num_games, fin in conn.execute(
+            'SELECT week, num_games, finalized FROM weeks WHERE league_id = ? ORDER BY week', (lid,)):
+        weeks[str(wk)] = {'games': {}, 'finalized': bool(fin), 'num_games': num_games}
+        if fin:
+            weeks[str(wk)].update(final_scores={}, allowances={}, card_additions={})
+    for wk, g in conn.execute(
+            'SELECT week, game FROM games WHERE league_id = ? ORDER BY week, game', (lid,)):
+        weeks[str(wk)]['games'][str(g)] = {}
+    for wk, g, uid, pl, pts in conn.execute(
+            'SELECT week, game, user_id, placement, points FROM placements'
+            ' WHERE league_id = ? ORDER BY week, game, placement', (lid,)):
+        weeks[str(wk)]['games'][str(g)][uid] = {'placement': pl, 'points': pts}
+    for wk, uid, pts in conn.execute(
+            'SELECT week, user_id, points FROM final_scores WHERE league_id = ?', (lid,)):
+        weeks[str(wk)]['final_scores'][uid] = pts
+    for wk, uid, cat, c_lim, p_lim in conn.execute(
+            'SELECT week, user_id, category, card_limit, price_limit FROM allowances'
+            ' WHERE league_id = ?', (lid,)):
+        weeks[str(wk)]['allowances'][uid] = {
+            'category': cat, 'card_limit': c_lim,
+            'price_limit': int(p_lim) if p_lim == int(p_lim) else p_lim}
+    for wk, uid, name, price in conn.execute(
+            'SELECT week, user_id, card_name, price FROM card_additions'
+            ' WHERE league_id = ? ORDER BY id', (lid,)):
+        if str(wk) in weeks:
+            weeks[str(wk)].setdefault('card_additions', {})\
+                .setdefault(uid, []).append(f"{name} (${price})")
+    return data
+
+class SqliteStorage(Storage):
+    def __init__(self, path: str):
+        self.conn = connect(path)
+
+    def league_id(self, guild_id: str, slug: str):
+        row = self.conn.execute(
+            'SELECT id FROM leagues WHERE guild_id = ? AND slug = ?', (guild_id, slug)
+        ).fetchone()
+        return row[0] if row else None
+
+    def exists(self, guild_id, slug):
+        return self.league_id(guild_id, slug) is not None
+
+    async def create(self, guild_id, slug, league_name, players):
+        with self.conn:
+            self.conn.execute('DELETE FROM leagues WHERE guild_id = ? AND slug = ?', (guild_id, slug))
+            lid = self.conn.execute(
+                'INSERT INTO leagues (guild_id, slug, name) VALUES (?, ?, ?)',
+                (guild_id, slug, league_name)
+            ).lastrowid
+        data = {}
+        store = SqliteLeagueStore(self.conn, lid, data)
+        store.record({'op': 'create', 'league_name': league_name, 'players': players})
+        return League(guild_id, slug, data, SqliteCardLedger(self.conn, lid), store)
+
+    async def open(self, guild_id, slug):
+        lid = self.league_id(guild_id, slug)
+        data = read_league(self.conn, lid)
+        return League(guild_id, slug, data, SqliteCardLedger(self.conn, lid),
+                      SqliteLeagueStore(self.conn, lid, data))
+
+    def close(self):
+        global _conn
+        self.conn.close()
+        _conn = None
+
+# --- One-shot import of existing league_*.json / cards_*.csv files ---
+
+# (row, removed) in the order of each week's card_additions history. A
+# history entry is matched to a live ledger row with the same name and
+# price, else the same name (a repriced card); entries left unmatched are
+# cards removed since and are kept as removed rows, as !removecard does.
+
+def history_rows(data: dict, card_rows) -> list:
+    live = {}
+    for r in card_rows:
+        live.setdefault((str(r['week']), r['user_id'], r['card_name']), []).append(r)
+    entries = []   # [key, price, matched row]
+    for w, wk in sorted(data['weeks'].items(), key=lambda x: int(x[0])):
+        for uid, cards in wk.get('card_additions', {}).items():
+            for card in cards:
+                name, _, price = card.rpartition(' ($')
+                entries.append([(w, uid, name), price.rstrip(')'), None])
+    for same_price in (True, False):
+        for e in entries:
+            rows = live.get(e[0])
+            if e[2] is None and rows:
+                row = next((r for r in rows if r['price'] == e[1] or not same_price), None)
+                if row is not None:
+                    rows.remove(row)
+                    e[2] = row
+    out = [(row, 0) if row is not None else
+           ({'week': w, 'user_id': uid, 'card_name': name, 'tcgplayer_id': '', 'price': price}, 1)
+           for (w, uid, name), price, row in entries]
+    out += [(r, 0) for rows in live.values() for r in rows]
+    return out
+
+def import_league(conn, guild_id: str, slug: str, data: dict, card_rows, replace: bool = False):
+    with conn:
+        row = conn.execute('SELECT id FROM leagues WHERE guild_id = ? AND slug = ?',
+                           (guild_id, slug)).fetchone()
+        if row and not replace:
+            return None
+        conn.execute('DELETE FROM leagues WHERE guild_id = ? AND slug = ?', (guild_id, slug))
+        lid = conn.execute('INSERT INTO leagues (guild_id, slug, name) VALUES (?, ?, ?)',
+                           (guild_id, slug, data['league_name'])).lastrowid
+        write_event(conn, lid, {'op': 'create', 'players': data['players']})
+        for w, wk in sorted(data['weeks'].items(), key=lambda x: int(x[0])):
+            write_event(conn, lid, {'op': 'week_opened', 'week': w,
+                                    'num_games': wk.get('num_games', len(wk['games']))})
+            for g, responses in wk['games'].items():
+                write_event(conn, lid, {'op': 'game_recorded', 'week': w, 'game': g,
+                                        'responses': responses})
+            if wk.get('finalized'):
+                write_event(conn, lid, {'op': 'week_finalized', 'week': w,
+                                        'final_scores': wk.get('final_scores', {}),
+                                        'allowances': wk.get('allowances', {})})
+        conn.executemany(
+            'INSERT INTO card_additions (league_id, week, user_id, card_name, tcgplayer_id, price, removed)'
+            ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(lid, int(r['week']), r['user_id'], r['card_name'], r['tcgplayer_id'], r['price'], removed)
+             for r, removed in history_rows(data, card_rows)]
+        )
+    return lid
+
+def import_files(directory: str, conn, replace: bool = False):
+    for path in sorted(glob.glob(os.path.join(directory, 'league_*.json'))):
+        m = re.fullmatch(r'league_(\d+)_(.+)\.json', os.path.basename(path))
+        if not m:
+            continue
+        guild_id, slug = m.groups()
+        data = load_state(path)
+        card_csv = os.path.join(directory, f'cards_{guild_id}_{slug}.csv')
+        rows = list(CsvCardLedger(card_csv)) if os.path.exists(card_csv) else []
+        lid = import_league(conn, guild_id, slug, data, rows, replace)
+        yield path, lid, len(rows)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import league JSON/CSV files into SQLite')
+    parser.add_argument('directory', nargs='?', default='.')
+    parser.add_argument('--db', default=os.getenv('LEAGUE_DB', 'mtg_league.sqlite3'))
+    parser.add_argument('--replace', action='store_true', help='overwrite leagues already imported')
+    args = parser.parse_args()
+    conn = connect(args.db)
+    for path, lid, n_cards in import_files(args.directory, conn, args.replace):
+        status = f'imported as league {lid} ({n_cards} cards)' if lid else 'already imported, skipped'
+        print(f'{path}: {status}')
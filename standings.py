@@ -0,0 +1,136 @@
+# Season standings kept up to date as league events are recorded, so
+# !viewleague and !addcard read precomputed values instead of walking every
+# week. Week points count from finalization and are summed from the raw
+# games, so score edits made after a week was finalized show up too.
+# Card usage comes from the card ledger.
+#
+#   total[pid]           season points
+#   weekly[pid][week]    points per finalized week
+#   allowances[pid][week]  {'category', 'card_limit', 'price_limit'}
+#   allowed[pid]         [season card limit, season price limit]
+#   cards[pid][week]     ["Name ($price)", ...]
+#   used[pid]            [card count, spend]
+#
+# version goes up on every change, for renderers that cache output.
+
+class Standings:
+    def __init__(self, players):
+        self.players = [str(p) for p in players]
+        self.total = {p: 0 for p in self.players}
+        self.weekly = {p: {} for p in self.players}
+        self.allowances = {p: {} for p in self.players}
+        self.allowed = {p: [0, 0.0] for p in self.players}
+        self.cards = {p: {} for p in self.players}
+        self.used = {p: [0, 0.0] for p in self.players}
+        self.weeks = []
+        self.version = 0
+
+    # Rebuild from the raw games and card rows
+
+    @classmethod
+    def build(cls, data: dict, ledger):
+        st = cls(data.get('players', []))
+        for week, wk in data.get('weeks', {}).items():
+            st.open_week(week)
+            if wk.get('finalized'):
+                st.finalize_week(week, wk)
+        for row in ledger:
+            st.add_card(row)
+        return st
+
+    def _player(self, pid):
+        if pid not in self.total:
+            self.players.append(pid)
+            self.total[pid] = 0
+            for d in (self.weekly, self.allowances, self.cards):
+                d[pid] = {}
+            self.allowed[pid] = [0, 0.0]
+            self.used[pid] = [0, 0.0]
+        return pid
+
+    def open_week(self, week: str):
+        if week not in self.weeks:
+            self.weeks.append(week)
+            self.weeks.sort(key=int)
+            self.version += 1
+
+    def finalize_week(self, week: str, wk: dict):
+        self.open_week(week)
+        for game in wk['games'].values():
+            for pid, rec in game.items():
+                self._player(pid)
+                self.weekly[pid][week] = self.weekly[pid].get(week, 0) + rec['points']
+                self.total[pid] += rec['points']
+        for pid, info in wk.get('allowances', {}).items():
+            self._player(pid)
+            self.allowances[pid][week] = info
+            self.allowed[pid][0] += info.get('card_limit', 0)
+            self.allowed[pid][1] += info.get('price_limit', 0)
+        self.version += 1
+
+    def edit_score(self, week: str, pid: str, delta: int):
+        self._player(pid)
+        self.weekly[pid][week] = self.weekly[pid].get(week, 0) + delta
+        self.total[pid] += delta
+        self.version += 1
+
+    def add_card(self, row: dict):
+        pid = self._player(row['user_id'])
+        self.open_week(row['week'])
+        self.cards[pid].setdefault(row['week'], []).append(f"{row['card_name']} (${row['price']})")
+        self.used[pid][0] += 1
+        self.used[pid][1] += float(row['price'])
+        self.version += 1
+
+    def remove_card(self, row: dict):
+        pid = row['user_id']
+        lst = self.cards.get(pid, {}).get(row['week'], [])
+        card = f"{row['card_name']} (${row['price']})"
+        if card in lst:
+            lst.remove(card)
+            self.used[pid][0] -= 1
+            self.used[pid][1] -= float(row['price'])
+            self.version += 1
+
+    # A ledger row's price changed from old (row holds the new price)
+
+    def reprice_card(self, row: dict, old: str):
+        lst = self.cards.get(row['user_id'], {}).get(row['week'], [])
+        card = f"{row['card_name']} (${old})"
+        if card in lst:
+            lst[lst.index(card)] = f"{row['card_name']} (${row['price']})"
+            self.used[row['user_id']][1] += float(row['price']) - float(old)
+            self.version += 1
+
+    # Called with each event before it is applied to data
+
+    def apply(self, data: dict, ev: dict):
+        op = ev['op']
+        if op == 'week_opened':
+            self.open_week(ev['week'])
+        elif op == 'week_finalized':
+            wk = data['weeks'][ev['week']]
+            self.finalize_week(ev['week'], {'games': wk['games'], 'allowances': ev['allowances']})
+        elif op == 'score_edited':
+            wk = data['weeks'][ev['week']]
+            if wk.get('finalized'):
+                old = wk['games'][ev['game']].get(ev['user_id'], {}).get('points', 0)
+                if ev['points'] != old:
+                    self.edit_score(ev['week'], ev['user_id'], ev['points'] - old)
+        elif op == 'card_added':
+            self.add_card(ev)
+        elif op == 'card_removed':
+            self.remove_card(ev)
+
+    def row(self, pid: str) -> tuple:
+        return (self.total.get(pid, 0), self.weekly.get(pid, {}), self.allowances.get(pid, {}),
+                self.allowed.get(pid), {w: sorted(c) for w, c in self.cards.get(pid, {}).items() if c},
+                [self.used[pid][0], round(self.used[pid][1], 2)] if pid in self.used else None)
+
+    # Compare against a rebuild from raw games; returns the players that
+    # drifted. Callers swap in the rebuilt standings when any did.
+
+    def check(self, data: dict, ledger):
+        fresh = Standings.build(data, ledger)
+        drift = [p for p in set(self.players) | set(fresh.players) if self.row(p) != fresh.row(p)]
+        return drift, fresh
@@ -0,0 +1,111 @@
+import asyncio, itertools, os, re, time
+from card_ledger import CsvCardLedger
+from standings import Standings
+from journal import JournaledStore, load_state, discard_journal
+
+# A loaded league: its state dict, card ledger and the store that persists
+# mutations. Every change to data goes through record() as a journal event,
+# made while holding lock, which also keeps standings current. pins counts
+# commands currently using the league, which keeps it from being evicted.
+# results_version changes whenever game results do; values come from one
+# process-wide counter, so a reloaded league never reuses an old version.
+
+RESULT_OPS = {'create', 'base', 'game_recorded', 'score_edited'}
+results_clock = itertools.count()
+
+class League:
+    def __init__(self, guild_id: str, slug: str, data: dict, ledger, store):
+        self.guild_id = guild_id
+        self.slug = slug
+        self.data = data
+        self.ledger = ledger
+        self.store = store
+        self.standings = Standings.build(data, ledger)
+        self.results_version = next(results_clock)
+        self.lock = asyncio.Lock()
+        self.pins = 0
+        self.last_used = time.monotonic()
+
+    def record(self, ev: dict):
+        self.standings.apply(self.data, ev)
+        if ev['op'] in RESULT_OPS:
+            self.results_version = next(results_clock)
+        return self.store.record(ev)
+
+    # Rebuild standings from the raw games in a worker thread, holding the
+    # lock so nothing changes meanwhile; returns the players that drifted
+
+    async def check_standings(self) -> list:
+        async with self.lock:
+            drift, fresh = await asyncio.to_thread(self.standings.check, self.data, self.ledger)
+            if drift:
+                fresh.version = self.standings.version + 1
+                self.standings = fresh
+        return drift
+
+    async def flush(self):
+        await self.store.flush()
+
+    def close(self):
+        self.store.close()
+
+def league_slug(league_name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_-]', '_', league_name)
+
+# Storage backends create and open leagues; see JsonStorage and
+# sqlite_storage.SqliteStorage
+
+class Storage:
+    def exists(self, guild_id: str, slug: str) -> bool:
+        raise NotImplementedError
+
+    async def create(self, guild_id: str, slug: str, league_name: str, players: list) -> League:
+        raise NotImplementedError
+
+    async def open(self, guild_id: str, slug: str) -> League:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+# league_<guild>_<slug>.json snapshot + journal, cards_<guild>_<slug>.csv ledger
+
+class JsonStorage(Storage):
+    def __init__(self, directory: str = '.', compact_bytes: int = 256 * 1024, delay: float = 2.0):
+        self.directory = directory
+        self.compact_bytes = compact_bytes
+        self.delay = delay
+
+    def paths(self, guild_id: str, slug: str):
+        return (os.path.join(self.directory, f'league_{guild_id}_{slug}.json'),
+                os.path.join(self.directory, f'cards_{guild_id}_{slug}.csv'))
+
+    def exists(self, guild_id, slug):
+        return os.path.exists(self.paths(guild_id, slug)[0])
+
+    def _store(self, path, state):
+        return JournaledStore(path, state, compact_bytes=self.compact_bytes, delay=self.delay)
+
+    async def create(self, guild_id, slug, league_name, players):
+        data_file, card_csv = self.paths(guild_id, slug)
+        discard_journal(data_file)
+        data = {}
+        store = self._store(data_file, data)
+        store.record({'op': 'create', 'league_name': league_name, 'players': players})
+        await store.flush()
+        ledger = await asyncio.to_thread(CsvCardLedger, card_csv)
+        return League(guild_id, slug, data, ledger, store)
+
+    async def open(self, guild_id, slug):
+        data_file, card_csv = self.paths(guild_id, slug)
+        data = await asyncio.to_thread(load_state, data_file)
+        ledger = await asyncio.to_thread(CsvCardLedger, card_csv)
+        return League(guild_id, slug, data, ledger, self._store(data_file, data))
+
+# LEAGUE_STORAGE=sqlite selects the SQLite backend (database at LEAGUE_DB)
+
+def storage_from_env(compact_bytes: int = 256 * 1024, delay: float = 2.0) -> Storage:
+    if os.getenv('LEAGUE_STORAGE', 'json') == 'sqlite':
+        from sqlite_storage import SqliteStorage
+        return SqliteStorage(os.getenv('LEAGUE_DB', 'mtg_league.sqlite3'))
+    return JsonStorage(compact_bytes=compact_bytes, delay=delay)